@@ -0,0 +1,56 @@
+import mmap
+import os
+import uuid
+
+
+class ArtifactStore:
+    """
+    Spills large tool outputs to files and keeps only a compact handle with a head/tail preview in messages.
+    Stored outputs are read back through memory maps, page by page, on the model's request.
+    """
+
+    def __init__(self,
+                 directory: str = "./agent_artifacts/tool_outputs",
+                 spill_threshold_chars: int = 4000,
+                 preview_chars: int = 800):
+        self.directory = directory
+        self.spill_threshold_chars = spill_threshold_chars
+        self.preview_chars = preview_chars
+        os.makedirs(self.directory, exist_ok=True)
+
+    def store(self, content: str) -> str:
+        """Return the content itself if it is small, otherwise spill it and return a handle with a preview."""
+        if len(content) <= self.spill_threshold_chars:
+            return content
+
+        artifact_id = uuid.uuid4().hex[:12]
+        data = content.encode("utf-8")
+        with open(self._artifact_path(artifact_id), "wb") as file:
+            file.write(data)
+
+        return (
+            f"[Output stored as artifact '{artifact_id}': {len(data)} bytes, {content.count(chr(10)) + 1} lines. "
+            f"Use `read_artifact_tool` to page through it.]\n"
+            f"--- head ---\n{content[:self.preview_chars]}\n"
+            f"--- tail ---\n{content[-self.preview_chars:]}"
+        )
+
+    def read(self, artifact_id: str, offset: int = 0, length: int = 4000) -> str:
+        """Read a page of a stored output. `offset` and `length` are in bytes."""
+        artifact_path = self._artifact_path(artifact_id)
+        if not os.path.exists(artifact_path):
+            raise KeyError(f"Artifact '{artifact_id}' not found.")
+
+        with open(artifact_path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0 or offset >= size:
+                return f"[Artifact '{artifact_id}' has {size} bytes, nothing at offset {offset}]"
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                page = mapped[max(offset, 0):offset + length]
+
+        end = min(offset + length, size)
+        return f"[Artifact '{artifact_id}' bytes {offset}-{end} of {size}]\n{page.decode('utf-8', errors='replace')}"
+
+    def _artifact_path(self, artifact_id: str) -> str:
+        # Artifact ids come from the model, so keep them inside the store directory
+        return os.path.join(self.directory, f"{os.path.basename(artifact_id)}.txt")
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from mock_openai_server import MockOpenAIConfig, MockOpenAIServer
+
+REPO_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARK_TASK = "I need an agent to get bitcoin data for the last week and make a plot"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _peak_memory_mb() -> dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def _llm_latencies(telemetry) -> list[float]:
+    return [span.latency_seconds for span in telemetry.spans() if span.kind == "llm"]
+
+
+def run_pipeline_case(base_url: str, work_directory: str, stream: bool) -> dict:
+    """Run the main.py pipeline once in a fresh process and working directory."""
+    os.chdir(work_directory)
+    os.environ["TOOL_CREATOR_STREAM"] = "true" if stream else "false"
+
+    import openai
+    from main import build_agent
+    from telemetry import Telemetry
+
+    telemetry = Telemetry()
+    client = openai.OpenAI(api_key="mock", base_url=base_url)
+
+    started_at = time.perf_counter()
+    agent_plan, build_results, tool_registry = build_agent(client, BENCHMARK_TASK, telemetry=telemetry)
+    duration_seconds = time.perf_counter() - started_at
+
+    return {
+        "duration_seconds": duration_seconds,
+        "planned_tools": len(agent_plan.tools),
+        "registered_tools": sum(build_result.ok for build_result in build_results),
+        "llm_latencies": _llm_latencies(telemetry),
+        **_peak_memory_mb(),
+    }
+
+
+def run_planner_coder_case(base_url: str, work_directory: str, sessions: int, max_sessions: int) -> dict:
+    """Run Planner -> Coder sessions of simple-planner-coder.py concurrently in a fresh process."""
+    os.chdir(work_directory)
+
+    spec = importlib.util.spec_from_file_location("simple_planner_coder",
+                                                  os.path.join(REPO_DIRECTORY, "simple-planner-coder.py"))
+    simple_planner_coder = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(simple_planner_coder)
+
+    from telemetry import Telemetry
+
+    telemetry = Telemetry()
+    llm_client = simple_planner_coder.LLMClient(model="mock", base_url=base_url, api_key="mock")
+    tasks = [{"session_id": f"session-{index:04d}", "task": BENCHMARK_TASK} for index in range(sessions)]
+
+    async def collect() -> list[dict]:
+        return [
+            session_result async for session_result in simple_planner_coder.run_sessions(
+                llm_client, tasks, sessions_directory=work_directory, max_concurrent_sessions=max_sessions,
+                telemetry=telemetry,
+            )
+        ]
+
+    started_at = time.perf_counter()
+    session_results = asyncio.run(collect())
+    duration_seconds = time.perf_counter() - started_at
+
+    return {
+        "duration_seconds": duration_seconds,
+        "sessions": len(session_results),
+        "failed_sessions": sum(session_result["status"] != "done" for session_result in session_results),
+        "session_latencies": [session_result["duration_seconds"] for session_result in session_results],
+        "llm_latencies": _llm_latencies(telemetry),
+        **_peak_memory_mb(),
+    }
+
+
+def _run_isolated(function, *args) -> dict:
+    # Every case runs in a new interpreter, so peak memory and import costs are not shared between cases
+    with tempfile.TemporaryDirectory(prefix="agent-benchmark-") as work_directory:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            return executor.submit(function, args[0], work_directory, *args[1:]).result()
+
+
+def benchmark_pipeline(server: MockOpenAIServer, plan_sizes: list[int], repeats: int, stream: bool) -> list[dict]:
+    reports = []
+    for plan_size in plan_sizes:
+        server.config.plan_size = plan_size
+        runs = [_run_isolated(run_pipeline_case, server.base_url, stream) for _ in range(repeats)]
+        durations = [run["duration_seconds"] for run in runs]
+        llm_latencies = [latency for run in runs for latency in run["llm_latencies"]]
+        reports.append({
+            "benchmark": "pipeline",
+            "plan_size": plan_size,
+            "runs": repeats,
+            "registered_tools": min(run["registered_tools"] for run in runs),
+            "tools_per_second": sum(run["registered_tools"] for run in runs) / sum(durations),
+            "p50_seconds": percentile(durations, 0.5),
+            "p99_seconds": percentile(durations, 0.99),
+            "llm_p50_seconds": percentile(llm_latencies, 0.5),
+            "llm_p99_seconds": percentile(llm_latencies, 0.99),
+            "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+            "peak_child_rss_mb": max(run["peak_child_rss_mb"] for run in runs),
+        })
+    return reports
+
+
+def benchmark_planner_coder(server: MockOpenAIServer, sessions: int, max_sessions: int) -> dict:
+    try:
+        run = _run_isolated(run_planner_coder_case, server.base_url, sessions, max_sessions)
+    except Exception as e:
+        # simple-planner-coder.py needs the llm, tools and utils packages of the full environment
+        return {"benchmark": "planner_coder", "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "benchmark": "planner_coder",
+        "sessions": run["sessions"],
+        "failed_sessions": run["failed_sessions"],
+        "sessions_per_second": run["sessions"] / run["duration_seconds"],
+        "p50_seconds": percentile(run["session_latencies"], 0.5),
+        "p99_seconds": percentile(run["session_latencies"], 0.99),
+        "llm_p50_seconds": percentile(run["llm_latencies"], 0.5),
+        "llm_p99_seconds": percentile(run["llm_latencies"], 0.99),
+        "peak_rss_mb": run["peak_rss_mb"],
+        "peak_child_rss_mb": run["peak_child_rss_mb"],
+    }
+
+
+def print_report(report: dict) -> None:
+    if "error" in report:
+        print(f"{report['benchmark']}: skipped, {report['error']}")
+        return
+    print("  ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in report.items()))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local mock OpenAI server")
+    parser.add_argument("--plan-sizes", default="1,10,50,100", help="Comma separated numbers of planned tools")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to the first token")
+    parser.add_argument("--output-tps", type=float, default=500.0, help="Output tokens per second")
+    parser.add_argument("--input-tps", type=float, default=0.0, help="Uncached input tokens per second, 0 is instant")
+    parser.add_argument("--canned", help="JSON file mapping request substrings to response texts")
+    parser.add_argument("--stream", action="store_true", help="Stream tool code generation")
+    parser.add_argument("--sessions", type=int, default=8, help="Planner/Coder sessions, 0 to skip")
+    parser.add_argument("--max-sessions", type=int, default=4)
+    parser.add_argument("--coder-steps", type=int, default=3, help="terminal_tool calls per Coder session")
+    parser.add_argument("--output", help="JSONL file for the reports")
+    args = parser.parse_args()
+
+    canned_responses = {}
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as file:
+            canned_responses = json.load(file)
+
+    config = MockOpenAIConfig(
+        latency_seconds=args.latency,
+        output_tokens_per_second=args.output_tps,
+        input_tokens_per_second=args.input_tps,
+        coder_tool_steps=args.coder_steps,
+        canned_responses=canned_responses,
+    )
+
+    with MockOpenAIServer(config) as server:
+        reports = benchmark_pipeline(server, [int(size) for size in args.plan_sizes.split(",")], args.repeats,
+                                     args.stream)
+        if args.sessions > 0:
+            reports.append(benchmark_planner_coder(server, args.sessions, args.max_sessions))
+
+    for report in reports:
+        print_report(report)
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as file:
+            for report in reports:
+                file.write(json.dumps(report) + "\n")
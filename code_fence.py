@@ -0,0 +1,80 @@
+import re
+
+OPENING_FENCE_PATTERN = re.compile(r"```[ \t]*([A-Za-z0-9_+-]*)[ \t]*\n")
+CLOSING_FENCE = "\n```"
+
+
+class CodeFenceExtractor:
+    """
+    Incrementally extracts the first fenced code block from streamed text.
+    A `python`/`py` block is preferred; a block without language is accepted as well.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._code_start: int | None = None
+        self._code_end: int | None = None
+        self._scan_from = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._code_end is not None
+
+    @property
+    def code(self) -> str | None:
+        """Extracted code when the closing fence arrived, otherwise None."""
+        if not self.closed:
+            return None
+        return self._buffer[self._code_start:self._code_end] + "\n"
+
+    def feed(self, delta: str) -> bool:
+        """Consume the next chunk of text. Returns True as soon as the code block is closed."""
+        if self.closed:
+            return True
+
+        self._buffer += delta
+
+        while self._code_start is None:
+            match = OPENING_FENCE_PATTERN.search(self._buffer, self._scan_from)
+            if match is None:
+                # Keep a tail so a fence split between chunks is still matched
+                self._scan_from = max(self._scan_from, len(self._buffer) - 32)
+                return False
+
+            if match.group(1).lower() in {"python", "py", ""}:
+                self._code_start = match.end()
+                self._scan_from = self._code_start
+                break
+
+            # Skip a block in another language, e.g. a json example before the code
+            skipped_closing_index = self._buffer.find(CLOSING_FENCE, match.end() - 1)
+            if skipped_closing_index == -1:
+                self._scan_from = match.start()
+                return False
+            self._scan_from = skipped_closing_index + len(CLOSING_FENCE)
+
+        closing_index = self._buffer.find(CLOSING_FENCE, max(self._code_start - 1, self._scan_from - len(CLOSING_FENCE)))
+        if closing_index == -1:
+            self._scan_from = len(self._buffer)
+            return False
+
+        self._code_end = closing_index
+        return True
+
+    def finish(self) -> str:
+        """
+        Return the extracted code after the stream ended.
+        Falls back to an unterminated block or to the whole text when the model omitted the fences.
+        """
+        if self.closed:
+            return self.code
+        if self._code_start is not None:
+            return self._buffer[self._code_start:]
+        return self._buffer.strip() + "\n"
+
+
+def extract_code(text: str) -> str:
+    """Extract the code block from a complete model response."""
+    extractor = CodeFenceExtractor()
+    extractor.feed(text)
+    return extractor.finish()
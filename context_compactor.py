@@ -0,0 +1,91 @@
+import json
+
+from pydantic import BaseModel
+
+
+class CompactionReport(BaseModel):
+    tokens_before: int
+    tokens_after: int
+    compacted_messages: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+class ContextCompactor:
+    """
+    Keeps the message history sent to the model within a token budget.
+    The system prompt, the first user message and the most recent messages are always kept verbatim;
+    older tool results, then older assistant and user texts, are collapsed to head/tail excerpts.
+    The original history is never modified, so the full conversation is still returned to the caller.
+    """
+
+    def __init__(self,
+                 token_budget: int = 32000,
+                 keep_recent_messages: int = 8,
+                 excerpt_chars: int = 400,
+                 chars_per_token: float = 4.0):
+        self.token_budget = token_budget
+        self.keep_recent_messages = keep_recent_messages
+        self.excerpt_chars = excerpt_chars
+        self.chars_per_token = chars_per_token
+
+    def estimate_tokens(self, messages: list[dict]) -> int:
+        return sum(self._estimate_message_tokens(message) for message in messages)
+
+    def compact(self, messages: list[dict]) -> tuple[list[dict], CompactionReport]:
+        """Return messages to send to the model and a report of the compaction."""
+        tokens_before = self.estimate_tokens(messages)
+        if tokens_before <= self.token_budget:
+            return messages, CompactionReport(tokens_before=tokens_before, tokens_after=tokens_before,
+                                              compacted_messages=0)
+
+        compacted = list(messages)
+        protected_indexes = self._protected_indexes(messages)
+        tokens = tokens_before
+        compacted_messages = 0
+
+        # Tool results are the bulkiest and least valuable part of old turns, so they go first
+        for roles in ({"tool"}, {"assistant", "user"}):
+            for index, message in enumerate(messages):
+                if tokens <= self.token_budget:
+                    break
+                if index in protected_indexes or message.get("role") not in roles:
+                    continue
+
+                content = message.get("content")
+                if not isinstance(content, str) or len(content) <= 2 * self.excerpt_chars:
+                    continue
+
+                compacted[index] = {**message, "content": self._excerpt(content)}
+                tokens += self._estimate_message_tokens(compacted[index]) - self._estimate_message_tokens(message)
+                compacted_messages += 1
+
+        return compacted, CompactionReport(tokens_before=tokens_before, tokens_after=tokens,
+                                           compacted_messages=compacted_messages)
+
+    def _protected_indexes(self, messages: list[dict]) -> set[int]:
+        protected_indexes = set(range(max(0, len(messages) - self.keep_recent_messages), len(messages)))
+        for index, message in enumerate(messages):
+            if message.get("role") == "system":
+                protected_indexes.add(index)
+            if message.get("role") == "user":
+                protected_indexes.add(index)
+                break
+        return protected_indexes
+
+    def _excerpt(self, content: str) -> str:
+        omitted_chars = len(content) - 2 * self.excerpt_chars
+        return (
+            f"{content[:self.excerpt_chars]}\n"
+            f"[... {omitted_chars} characters omitted to save context ...]\n"
+            f"{content[-self.excerpt_chars:]}"
+        )
+
+    def _estimate_message_tokens(self, message: dict) -> int:
+        chars = len(message.get("content") or "")
+        if message.get("tool_calls"):
+            chars += len(json.dumps(message["tool_calls"]))
+        # A few tokens of per-message overhead for role and separators
+        return int(chars / self.chars_per_token) + 4
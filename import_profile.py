@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+import time
+
+from pydantic import BaseModel
+
+
+class ImportTiming(BaseModel):
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    # Nesting level in the import tree, 0 for modules imported by the script itself
+    depth: int
+
+
+class ImportProfile(BaseModel):
+    script: str
+    # Wall time of a new interpreter importing the script, and of an interpreter doing nothing
+    startup_seconds: float
+    interpreter_seconds: float
+    imports: list[ImportTiming]
+
+    def top(self, count: int = 15, depth: int | None = 0) -> list[ImportTiming]:
+        """Slowest imports by cumulative time, by default only the ones made by the script itself."""
+        imports = [timing for timing in self.imports if depth is None or timing.depth == depth]
+        return sorted(imports, key=lambda timing: timing.cumulative_seconds, reverse=True)[:count]
+
+    def report(self, count: int = 15) -> str:
+        lines = [
+            f"Start-up of {self.script}: {self.startup_seconds:.3f}s "
+            f"(bare interpreter {self.interpreter_seconds:.3f}s, "
+            f"script {self.startup_seconds - self.interpreter_seconds:+.3f}s)",
+            f"{'cumulative':>11} {'self':>9}  module",
+        ]
+        lines.extend(f"{timing.cumulative_seconds:10.3f}s {timing.self_seconds:8.3f}s  {timing.module}"
+                     for timing in self.top(count))
+        return "\n".join(lines)
+
+
+def _run_interpreter(arguments: list[str], cwd: str) -> tuple[float, str]:
+    started_at = time.perf_counter()
+    completed = subprocess.run([sys.executable, *arguments], cwd=cwd, capture_output=True, text=True,
+                               stdin=subprocess.DEVNULL)
+    return time.perf_counter() - started_at, completed.stderr
+
+
+def parse_import_time(output: str) -> list[ImportTiming]:
+    """Parse `python -X importtime` output."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        name = module.rstrip()
+        imports.append(ImportTiming(module=name.strip(),
+                                    self_seconds=int(self_us) / 1e6,
+                                    cumulative_seconds=int(cumulative_us) / 1e6,
+                                    depth=(len(name) - len(name.lstrip()) - 1) // 2))
+    return imports
+
+
+def profile_imports(script_path: str) -> ImportProfile:
+    """
+    Import-time profile of a script in a fresh interpreter.
+    The script is executed under another module name, so only its module level code runs, not its CLI.
+    """
+    script_path = os.path.abspath(script_path)
+    code = f"import runpy; runpy.run_path({script_path!r}, run_name='__import_profile__')"
+    cwd = os.path.dirname(script_path)
+    interpreter_seconds, interpreter_output = _run_interpreter(["-X", "importtime", "-c", "pass"], cwd)
+    startup_seconds, output = _run_interpreter(["-X", "importtime", "-c", code], cwd)
+    # Modules imported by every interpreter at start, e.g. site, are not the script's cost
+    interpreter_modules = {timing.module for timing in parse_import_time(interpreter_output)}
+    imports = [timing for timing in parse_import_time(output) if timing.module not in interpreter_modules]
+    return ImportProfile(script=os.path.basename(script_path),
+                         startup_seconds=startup_seconds,
+                         interpreter_seconds=interpreter_seconds,
+                         imports=imports)
+
+
+def print_import_profile(script_path: str, count: int = 15) -> None:
+    print(profile_imports(script_path).report(count))
+
+
+if __name__ == "__main__":
+
+    for path in sys.argv[1:] or ["main.py"]:
+        print_import_profile(path)
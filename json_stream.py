@@ -0,0 +1,65 @@
+import json
+
+
+class JsonArrayItemExtractor:
+    """
+    Incrementally extracts items of an array under a top-level key of a streamed JSON object,
+    e.g. the tools of a structured output plan while the rest of the plan is still generated.
+    Each item is returned once, as soon as its closing bracket arrives.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._position = 0
+        # Open brackets, "{" or "["
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        # Last string finished directly in the top-level object, the key of the next value
+        self._last_top_level_string: str | None = None
+        # Depth of the items of the array under `key`, None until the array is opened
+        self._item_depth: int | None = None
+        self._item_start = 0
+
+    def feed(self, delta: str) -> list:
+        """Consume the next chunk of text. Returns the items completed by it."""
+        self._buffer += delta
+        items = []
+
+        while self._position < len(self._buffer):
+            character = self._buffer[self._position]
+            position = self._position
+            self._position += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif character == "\\":
+                    self._escaped = True
+                elif character == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_top_level_string = json.loads(self._buffer[self._string_start:self._position])
+                continue
+
+            if character == '"':
+                self._in_string = True
+                self._string_start = position
+            elif character in "{[":
+                self._stack.append(character)
+                if character == "[" and len(self._stack) == 2 and self._last_top_level_string == self.key:
+                    self._item_depth = 3
+                elif len(self._stack) == self._item_depth:
+                    self._item_start = position
+            elif character in "}]":
+                if len(self._stack) == self._item_depth and character == "}":
+                    items.append(json.loads(self._buffer[self._item_start:self._position]))
+                elif len(self._stack) == 2 and self._item_depth is not None:
+                    # The array is closed, later arrays under other keys are not items
+                    self._item_depth = None
+                if self._stack:
+                    self._stack.pop()
+
+        return items
@@ -0,0 +1,148 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+
+import httpx
+import openai
+
+RECORD = "record"
+REPLAY = "replay"
+# Replay recorded requests and record the missing ones
+AUTO = "auto"
+
+# Prompt fragments that change between otherwise identical runs, e.g. the time info section of the system prompt
+DEFAULT_VOLATILE_PATTERNS = [
+    r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:?\d{2})?",
+    r"\d{4}-\d{2}-\d{2}",
+    r"\d{2}:\d{2}:\d{2}",
+    r"\d{8}_\d{4}",
+    r"\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b",
+    r"Is Weekend: (True|False)",
+]
+
+# Response headers kept in the cassette, the body is stored decoded
+RECORDED_HEADERS = ("content-type",)
+
+
+class Cassette:
+    """
+    On-disk store of LLM API request/response pairs keyed by a normalized request hash.
+    Entries are appended to a JSONL file with zlib-compressed bodies. Identical requests recorded several
+    times are replayed in the recorded order, the last response is repeated afterwards.
+    """
+
+    def __init__(self, path: str, mode: str = REPLAY, volatile_patterns: list[str] | None = None):
+        if mode not in (RECORD, REPLAY, AUTO):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self._volatile_patterns = [
+            re.compile(pattern) for pattern in (volatile_patterns if volatile_patterns is not None
+                                                else DEFAULT_VOLATILE_PATTERNS)
+        ]
+        self._lock = threading.Lock()
+        self._entries: dict[str, list[dict]] = {}
+        self._replay_positions: dict[str, int] = {}
+        if mode != RECORD:
+            self._load()
+
+    def request_key(self, request: httpx.Request) -> str:
+        body = request.content.decode("utf-8", errors="replace")
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+        except json.JSONDecodeError:
+            pass
+        for pattern in self._volatile_patterns:
+            body = pattern.sub("<volatile>", body)
+        return hashlib.sha256(f"{request.method} {request.url.path}\n{body}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def put(self, key: str, status_code: int, headers: dict[str, str], content: bytes) -> None:
+        entry = {
+            "key": key,
+            "status_code": status_code,
+            "headers": headers,
+            "body": base64.b64encode(zlib.compress(content)).decode("ascii"),
+        }
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            # Replay in auto mode must not serve the response recorded just now again
+            self._replay_positions[key] = len(self._entries[key])
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    @staticmethod
+    def entry_content(entry: dict) -> bytes:
+        return zlib.decompress(base64.b64decode(entry["body"]))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport serving requests from a cassette and recording real responses into it."""
+
+    def __init__(self, cassette: Cassette, transport: httpx.BaseTransport | None = None):
+        self.cassette = cassette
+        self._transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        key = self.cassette.request_key(request)
+
+        if self.cassette.mode != RECORD:
+            entry = self.cassette.get(key)
+            if entry is not None:
+                return httpx.Response(entry["status_code"], headers=entry["headers"],
+                                      content=Cassette.entry_content(entry), request=request)
+            if self.cassette.mode == REPLAY:
+                # A client error is raised by the SDK at once, while transport errors would be retried
+                return httpx.Response(404, request=request, json={"error": {
+                    "message": f"Request {request.method} {request.url.path} is not in the cassette "
+                               f"{self.cassette.path}",
+                    "type": "cassette_miss",
+                }})
+
+        # Streams are recorded whole and replayed at once
+        response = self._transport.handle_request(request)
+        try:
+            content = response.read()
+        finally:
+            response.close()
+        headers = {name: value for name, value in response.headers.items() if name.lower() in RECORDED_HEADERS}
+        if response.status_code < 500 and response.status_code != 429:
+            # Transient failures are retried by the SDK and would only be replayed as failures
+            self.cassette.put(key, response.status_code, headers, content)
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def cassette_http_client(cassette: Cassette, **kwargs) -> httpx.Client:
+    """OpenAI SDK http client going through the cassette. `kwargs` are passed to the client, e.g. event hooks."""
+    return openai.DefaultHttpxClient(transport=CassetteTransport(cassette), **kwargs)
+
+
+def attach_cassette(llm_client, cassette: Cassette):
+    """Route the `openai.OpenAI` client held by `llm_client.client` (e.g. LLMClient) through the cassette."""
+    llm_client.client = llm_client.client.with_options(http_client=cassette_http_client(cassette))
+    return llm_client
@@ -1,19 +1,118 @@
-import dotenv
+import os
+import sys
+from functools import partial
+from typing import TYPE_CHECKING, Callable
 
-from models import BaseTool
+import dotenv
 
 dotenv.load_dotenv()
 
-import openai
-
-from tool_file_utils import (format_generated_tool_filename, create_generated_tools_directory)
+from models import AgentSchema
+from tool_builder import ToolBuilder, ToolBuildResult
+from tool_bundle import build_tool_bundle, register_tool_bundle
+from tool_code_cache import ToolCodeCache
+from plan_cache import PlanCache
+from tool_validator import ToolValidator
+from tool_sandbox import ToolSandbox
+from prompt_assembly import PromptCacheStats
 from tool_registry import ToolRegistry
+from tool_registry_store import ToolRegistryStore
 from tool_creator import ToolCreator
 from schema_planner import AgentSchemaPlanner
+from telemetry import Telemetry
+from tool_worker_pool import ToolWorkerPool
+
+# openai and the cassette are imported where the client is created, so importing this module stays cheap
+if TYPE_CHECKING:
+    import openai
+
+
+def build_agent(client: "openai.OpenAI",
+                task: str,
+                model: str = "gpt-4o-mini",
+                cache_stats: PromptCacheStats | None = None,
+                telemetry: Telemetry | None = None,
+                worker_pool: ToolWorkerPool | None = None,
+                on_plan: Callable[[AgentSchema], None] | None = None,
+                previous_task: str | None = None,
+                ) -> tuple[AgentSchema, list[ToolBuildResult], ToolRegistry]:
+    """
+    Plan an agent for the task, then generate, check and register its tools.
+    `on_plan` is called with the plan as soon as planning finishes, before the remaining tools are built.
+    With `previous_task`, the task is re-planned incrementally from its cached plan and unchanged tools are reused.
+    """
+    schema_planner = AgentSchemaPlanner(client=client, model=model, plan_cache=PlanCache(),
+                                        cache_stats=cache_stats, telemetry=telemetry)
+    tool_creator = ToolCreator(
+        client=client,
+        model=model,
+        code_cache=ToolCodeCache(),
+        stream=os.getenv("TOOL_CREATOR_STREAM", "true").lower() == "true",
+        validator=ToolValidator(),
+        refinement_count=3,
+        cache_stats=cache_stats,
+        telemetry=telemetry,
+    )
+    tool_registry = ToolRegistry(store=ToolRegistryStore())
+
+    tool_builder = ToolBuilder(
+        tool_creator=tool_creator,
+        tool_registry=tool_registry,
+        max_concurrency=int(os.getenv("TOOL_BUILD_CONCURRENCY", "4")),
+        bypass_cache=os.getenv("TOOL_CODE_CACHE_BYPASS", "false").lower() == "true",
+        sandbox=ToolSandbox(),
+        lazy=True,
+        worker_pool=worker_pool,
+    )
+
+    # A streamed plan hands over every tool as soon as its schema is complete, so code generation overlaps planning
+    on_tool_planned = None
+    if os.getenv("PLANNER_STREAM", "true").lower() == "true":
+        on_tool_planned = partial(tool_builder.speculate, task=task)
+
+    try:
+        agent_plan_diff = schema_planner.plan_incremental(task, previous_task=previous_task,
+                                                          on_tool_planned=on_tool_planned)
+    except BaseException:
+        # Tools speculated before the failure would keep generating files nobody collects
+        tool_builder.cancel_speculations()
+        raise
+    agent_plan = agent_plan_diff.agent_schema
+    if on_plan is not None:
+        on_plan(agent_plan)
+
+    # Warm restart: planned tools of previous runs are reopened from the store without importing them, so a tool
+    # that fails to build keeps its previous version. Tools of other agents stay in the store only
+    tool_registry.restore(tool_names={tool_schema.name for tool_schema in agent_plan.tools})
+
+    build_results = tool_builder.build(
+        agent_plan.tools,
+        task=task,
+        regenerate={tool_schema.name for tool_schema in agent_plan_diff.tools_to_regenerate},
+    )
+
+    # Bundle mode: built tools are packed into one precompiled archive and imported from it on first use.
+    # Tools of a worker pool are never imported in this process, so they keep their proxies
+    tool_bundle_path = os.getenv("TOOL_BUNDLE_PATH")
+    if tool_bundle_path and worker_pool is None:
+        build_tool_bundle(tool_builder.generated_tool_dir, tool_bundle_path)
+        # A tool failing to register from the bundle stays registered from its source
+        register_tool_bundle(tool_registry, tool_bundle_path,
+                             tool_filepaths=[build_result.tool_filepath for build_result in build_results
+                                             if build_result.ok])
+
+    return agent_plan, build_results, tool_registry
 
 
 if __name__ == "__main__":
 
+    if "--profile-imports" in sys.argv:
+        from import_profile import print_import_profile
+        print_import_profile(__file__)
+        sys.exit(0)
+
+    import openai
+
     task = """
     
     I need an agent to get bitcoin data for the last week and make a plot
@@ -29,35 +128,48 @@ if __name__ == "__main__":
     
     """
 
-    client = openai.OpenAI()
+    telemetry = Telemetry(jsonl_path=os.getenv("TELEMETRY_JSONL") or None)
+    if os.getenv("TELEMETRY_METRICS_PORT"):
+        telemetry.serve_prometheus(int(os.getenv("TELEMETRY_METRICS_PORT")))
 
-    schema_planner = AgentSchemaPlanner(client=client, model="gpt-4o-mini")
-    tool_creator = ToolCreator(client=client, model="gpt-4o-mini")
-    tool_registry = ToolRegistry()
+    # The request hook reads the SDK retry counter of every LLM call into its telemetry span
+    event_hooks = {"request": [telemetry.on_http_request]}
+    if os.getenv("LLM_CASSETTE"):
+        from llm_cassette import Cassette, cassette_http_client
+        cassette = Cassette(os.getenv("LLM_CASSETTE"), mode=os.getenv("LLM_CASSETTE_MODE", "replay"))
+        client = openai.OpenAI(http_client=cassette_http_client(cassette, event_hooks=event_hooks))
+    else:
+        client = openai.OpenAI(http_client=openai.DefaultHttpxClient(event_hooks=event_hooks))
 
+    cache_stats = PromptCacheStats()
 
-    agent_plan = schema_planner.plan(task)
+    # Registered tools run in warm worker processes when a pool size is configured
+    worker_pool_size = int(os.getenv("TOOL_WORKER_POOL_SIZE", "0"))
+    worker_pool = ToolWorkerPool(workers=worker_pool_size) if worker_pool_size > 0 else None
 
-    print("*************** PLANNED AGENT **************")
-    print(agent_plan)
-    print("********************************************")
+    def print_plan(agent_plan: AgentSchema) -> None:
+        print("*************** PLANNED AGENT **************")
+        print(agent_plan)
+        print("********************************************")
 
-    planned_tools = agent_plan.tools
+    agent_plan, build_results, tool_registry = build_agent(client, task, cache_stats=cache_stats, telemetry=telemetry,
+                                                           worker_pool=worker_pool, on_plan=print_plan)
 
-    for tool_schema in planned_tools:
+    for build_result in build_results:
+        if not build_result.ok:
+            print(f"Tool '{build_result.tool_schema.name}' skipped: {build_result.error}")
 
-        tools_directory = create_generated_tools_directory()
-        tool_file_name = format_generated_tool_filename(tool_schema.name)
-        tool_filepath = f"{tools_directory}/{tool_file_name}"
-
-        tool_code: str = tool_creator.generate_tool_code(tool_schema=tool_schema, task=task)
-
-        tool_creator.save_code_to_file(tool_code, python_tool_file_path=tool_filepath)
+    print("************** TOOLS ***************")
+    print(tool_registry.list_tools())
+    print("*************************************")
 
-        tool_instance: BaseTool = tool_creator.get_tool_instance(python_tool_file_path=tool_filepath)
+    print("********** PROMPT CACHE ************")
+    print(cache_stats.summary())
+    print("*************************************")
 
-        tool_registry.register(tool=tool_instance)
+    print("************ TELEMETRY *************")
+    print(telemetry.summary())
+    print("*************************************")
 
-    print("************** TOOLS ***************")
-    print(tool_registry.list_tools())
-    print("*************************************")
\ No newline at end of file
+    if worker_pool is not None:
+        worker_pool.close()
@@ -0,0 +1,333 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pydantic import BaseModel
+
+MOCK_TOOL_CODE_TEMPLATE = '''from models import BaseTool, ToolParameter
+
+
+class {class_name}(BaseTool):
+    """{description}"""
+
+    def __init__(self):
+        super().__init__(
+            identifier="{name}",
+            name="{name}",
+            description="{description}",
+            parameters=[
+                ToolParameter(name="value", type="str", description="Value to process", required=True),
+            ],
+        )
+
+    def __call__(self, value: str) -> str:
+        if not isinstance(value, str):
+            raise ValueError("value must be a string")
+        return value.upper()
+
+
+if __name__ == "__main__":
+    assert {class_name}()("ok") == "OK"
+'''
+
+
+class MockOpenAIConfig(BaseModel):
+    # Time to the first output token of every request
+    latency_seconds: float = 0.05
+    output_tokens_per_second: float = 500.0
+    # Prefill rate for input tokens that are not served from the simulated prompt cache, 0 means instant
+    input_tokens_per_second: float = 0.0
+    chars_per_token: float = 4.0
+    # Number of tools in planned agents
+    plan_size: int = 3
+    # Number of terminal_tool steps the Coder takes before finishing
+    coder_tool_steps: int = 1
+    terminal_command: str = "echo benchmark"
+    # Output text returned for requests whose input contains the key
+    canned_responses: dict[str, str] = {}
+
+
+class MockOpenAIServer:
+    """
+    Local OpenAI-compatible stand-in for offline benchmarks.
+    Serves the Responses API (plain, structured and streamed) and Chat Completions with tool calls,
+    simulating latency, token rates and a prefix prompt cache. Planned agents, tool code and
+    Planner/Coder turns are synthesized from the requests unless a canned response matches.
+    """
+
+    def __init__(self, config: MockOpenAIConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockOpenAIConfig()
+        self._lock = threading.Lock()
+        self._seen_prefixes: set[str] = set()
+        self.request_count = 0
+        self._http_server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._http_server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._http_server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._http_server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def reset_prompt_cache(self) -> None:
+        with self._lock:
+            self._seen_prefixes.clear()
+
+    def _make_handler(self):
+        server = self
+
+        class MockOpenAIHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.request_count += 1
+                try:
+                    if self.path.endswith("/responses"):
+                        server._handle_responses(self, body)
+                    elif self.path.endswith("/chat/completions"):
+                        server._handle_chat_completions(self, body)
+                    else:
+                        self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client closed a stream early, e.g. at the closing code fence
+                    pass
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MockOpenAIHandler
+
+    # Responses API
+
+    def _handle_responses(self, handler, body: dict) -> None:
+        messages = body.get("input")
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        output_text = self._canned_response(messages)
+        if output_text is None:
+            text_format = (body.get("text") or {}).get("format") or {}
+            if text_format.get("type") == "json_schema":
+                output_text = json.dumps(self._agent_plan(messages))
+            else:
+                output_text = self._tool_code(messages)
+
+        input_tokens, cached_tokens = self._count_input_tokens(messages)
+        output_tokens = self._count_tokens(output_text)
+        usage = {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": cached_tokens},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        }
+        response_id = f"resp_{uuid.uuid4().hex}"
+        item_id = f"msg_{uuid.uuid4().hex}"
+
+        def response_payload(text: str, status: str, response_usage: dict | None) -> dict:
+            return {
+                "id": response_id,
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": body.get("model", "mock"),
+                "status": status,
+                "parallel_tool_calls": False,
+                "tool_choice": "auto",
+                "tools": [],
+                "output": [
+                    {
+                        "type": "message",
+                        "id": item_id,
+                        "role": "assistant",
+                        "status": status,
+                        "content": [{"type": "output_text", "text": text, "annotations": []}],
+                    }
+                ],
+                "usage": response_usage,
+            }
+
+        self._wait_prefill(input_tokens - cached_tokens)
+
+        if not body.get("stream"):
+            time.sleep(self.config.latency_seconds + output_tokens / self.config.output_tokens_per_second)
+            handler._send_json(200, response_payload(output_text, "completed", usage))
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        handler.close_connection = True
+
+        def send_event(event: dict) -> None:
+            handler.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        sequence_number = 0
+        send_event({"type": "response.created", "sequence_number": sequence_number,
+                    "response": response_payload("", "in_progress", None)})
+        time.sleep(self.config.latency_seconds)
+
+        for delta in self._chunks(output_text):
+            sequence_number += 1
+            time.sleep(self._count_tokens(delta) / self.config.output_tokens_per_second)
+            send_event({"type": "response.output_text.delta", "sequence_number": sequence_number,
+                        "item_id": item_id, "output_index": 0, "content_index": 0, "delta": delta, "logprobs": []})
+
+        sequence_number += 1
+        send_event({"type": "response.completed", "sequence_number": sequence_number,
+                    "response": response_payload(output_text, "completed", usage)})
+
+    # Chat Completions API
+
+    def _handle_chat_completions(self, handler, body: dict) -> None:
+        messages = body.get("messages", [])
+        tool_names = {tool.get("function", {}).get("name") for tool in body.get("tools") or []}
+
+        content = self._canned_response(messages)
+        tool_calls = None
+        if content is None and tool_names:
+            tool_calls = [self._next_tool_call(messages, tool_names)]
+        elif content is None:
+            content = self._tool_code(messages)
+
+        input_tokens, cached_tokens = self._count_input_tokens(messages)
+        output_tokens = self._count_tokens(content or json.dumps(tool_calls))
+        self._wait_prefill(input_tokens - cached_tokens)
+        time.sleep(self.config.latency_seconds + output_tokens / self.config.output_tokens_per_second)
+
+        handler._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "tool_calls": tool_calls},
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": input_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        })
+
+    def _next_tool_call(self, messages: list[dict], tool_names: set[str]) -> dict:
+        tool_steps = sum(1 for message in messages if message.get("role") == "tool")
+        if "terminal_tool" in tool_names and tool_steps < self.config.coder_tool_steps:
+            name, arguments = "terminal_tool", {"command": self.config.terminal_command}
+        elif "finish_task_tool" in tool_names:
+            name, arguments = "finish_task_tool", {"answer": f"Finished after {tool_steps} tool calls"}
+        else:
+            name, arguments = sorted(tool_names)[0], {}
+        return {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)}}
+
+    # Synthesized content
+
+    def _agent_plan(self, messages: list[dict]) -> dict:
+        return {
+            "name": "MockAgent",
+            "description": "Agent planned by the mock OpenAI server",
+            "system_prompt": "You are a mock agent.",
+            "tools": [
+                {
+                    "name": f"MockTool{index}",
+                    "description": f"Mock tool number {index}",
+                    "parameters": [
+                        {"name": "value", "type": "str", "description": "Value to process", "required": "true"}
+                    ],
+                    "implementation_details_description": "Return the value in upper case.",
+                }
+                for index in range(self.config.plan_size)
+            ],
+        }
+
+    def _tool_code(self, messages: list[dict]) -> str:
+        text = self._join_contents(messages)
+        # Tool prompts embed the tool schema as compact JSON
+        match = re.search(r'\{"name":\s*"(\w+)",\s*"description":\s*"([^"]*)"', text)
+        name, description = match.groups() if match else ("MockTool", "Mock tool")
+        class_name = name[:1].upper() + name[1:]
+        code = MOCK_TOOL_CODE_TEMPLATE.format(class_name=class_name, name=name, description=description)
+        return f"```python\n{code}```\n\nThe tool uppercases its input."
+
+    def _canned_response(self, messages: list[dict]) -> str | None:
+        text = self._join_contents(messages)
+        for key, response in self.config.canned_responses.items():
+            if key in text:
+                return response
+        return None
+
+    # Token accounting
+
+    def _count_tokens(self, text: str) -> int:
+        return max(1, int(len(text) / self.config.chars_per_token))
+
+    def _count_input_tokens(self, messages: list[dict]) -> tuple[int, int]:
+        """Count input tokens and the tokens of the longest message prefix seen by earlier requests."""
+        input_tokens = 0
+        cached_tokens = 0
+        prefix_hash = hashlib.sha256()
+        with self._lock:
+            for message in messages:
+                prefix_hash.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+                input_tokens += self._count_tokens(self._message_text(message))
+                digest = prefix_hash.copy().hexdigest()
+                if digest in self._seen_prefixes:
+                    cached_tokens = input_tokens
+                self._seen_prefixes.add(digest)
+        return input_tokens, cached_tokens
+
+    def _wait_prefill(self, uncached_tokens: int) -> None:
+        if self.config.input_tokens_per_second > 0:
+            time.sleep(uncached_tokens / self.config.input_tokens_per_second)
+
+    @staticmethod
+    def _chunks(text: str, chunk_chars: int = 16) -> list[str]:
+        return [text[index:index + chunk_chars] for index in range(0, len(text), chunk_chars)]
+
+    @staticmethod
+    def _message_text(message: dict) -> str:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content + json.dumps(message.get("tool_calls") or "")
+
+    @classmethod
+    def _join_contents(cls, messages: list[dict]) -> str:
+        return "\n".join(cls._message_text(message) for message in messages or [])
@@ -20,6 +20,35 @@ class AgentSchema(BaseModel):
     system_prompt: str
     tools: list[ToolSchema]
 
+class AgentSchemaDiff(BaseModel):
+    agent_schema: AgentSchema
+    added_tools: list[ToolSchema] = []
+    changed_tools: list[ToolSchema] = []
+    unchanged_tools: list[ToolSchema] = []
+    removed_tools: list[ToolSchema] = []
+
+    @property
+    def tools_to_regenerate(self) -> list[ToolSchema]:
+        return self.added_tools + self.changed_tools
+
+    @staticmethod
+    def between(previous: AgentSchema | None, current: AgentSchema) -> "AgentSchemaDiff":
+        """Compare tools of two plans by name."""
+        previous_tools = {tool.name: tool for tool in previous.tools} if previous else {}
+        current_names = {tool.name for tool in current.tools}
+
+        diff = AgentSchemaDiff(agent_schema=current)
+        for tool in current.tools:
+            previous_tool = previous_tools.get(tool.name)
+            if previous_tool is None:
+                diff.added_tools.append(tool)
+            elif previous_tool != tool:
+                diff.changed_tools.append(tool)
+            else:
+                diff.unchanged_tools.append(tool)
+        diff.removed_tools = [tool for name, tool in previous_tools.items() if name not in current_names]
+        return diff
+
 
 # Base tool class
 
@@ -41,3 +70,17 @@ class BaseTool(BaseModel):
 
     def tool_info(self) -> str:
         return self.model_dump_json()
+
+
+# Tool metadata known without importing the tool module
+
+class ToolManifest(BaseModel):
+    identifier: str
+    name: str
+    description: str
+    parameters: list[ToolParameter]
+    tool_filepath: str
+    content_hash: str
+
+    def tool_info(self) -> str:
+        return self.model_dump_json(include={"identifier", "name", "description", "parameters"})
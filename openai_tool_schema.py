@@ -0,0 +1,46 @@
+import re
+
+from models import BaseTool, ToolManifest
+
+JSON_SCHEMA_TYPES = {
+    "str": "string",
+    "string": "string",
+    "int": "integer",
+    "integer": "integer",
+    "float": "number",
+    "number": "number",
+    "bool": "boolean",
+    "boolean": "boolean",
+    "list": "array",
+    "array": "array",
+    "dict": "object",
+    "object": "object",
+}
+
+
+def to_function_name(tool_identifier: str) -> str:
+    """OpenAI function names allow only letters, digits, `_` and `-` and are limited to 64 characters."""
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", tool_identifier)[:64]
+
+
+def to_openai_function_schema(tool: BaseTool | ToolManifest) -> dict:
+    """Build the chat completions function-calling schema of a tool."""
+    properties = {}
+    for parameter in tool.parameters:
+        json_type = JSON_SCHEMA_TYPES.get(parameter.type.lower().split("[")[0], "string")
+        properties[parameter.name] = {"type": json_type, "description": parameter.description}
+        if json_type == "array":
+            properties[parameter.name]["items"] = {}
+
+    return {
+        "type": "function",
+        "function": {
+            "name": to_function_name(tool.identifier),
+            "description": f"{tool.name}: {tool.description}",
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": [parameter.name for parameter in tool.parameters if parameter.required],
+            },
+        },
+    }
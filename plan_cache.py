@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import re
+
+from models import AgentSchema
+
+
+def normalize_task(task: str) -> str:
+    """Collapse whitespace so formatting-only edits of a task hit the same cache entry."""
+    return re.sub(r"\s+", " ", task).strip()
+
+
+class PlanCache:
+    """
+    Persistent cache of agent plans keyed on the normalized task text and model.
+    """
+
+    def __init__(self, cache_dir: str = "./generated_tools/.plans"):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(task: str, model: str) -> str:
+        payload = json.dumps({"task": normalize_task(task), "model": model}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, task: str, model: str) -> AgentSchema | None:
+        """Return the cached plan for the task or None."""
+        return self._read(self._entry_path(self.make_key(task, model)))
+
+    def put(self, task: str, model: str, agent_schema: AgentSchema) -> None:
+        """Store the plan for the task."""
+        payload = json.dumps(
+            {
+                "task": normalize_task(task),
+                "model": model,
+                "plan": agent_schema.model_dump(),
+            },
+            ensure_ascii=False,
+        )
+        self._write(self._entry_path(self.make_key(task, model)), payload)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _read(path: str) -> AgentSchema | None:
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                payload = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return AgentSchema.model_validate(payload["plan"])
+
+    @staticmethod
+    def _write(path: str, payload: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(payload)
+        os.replace(tmp_path, path)
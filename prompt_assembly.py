@@ -0,0 +1,75 @@
+import threading
+
+from pydantic import BaseModel
+
+from telemetry import read_usage
+
+# Stability levels of prompt sections, from content shared by every request to content unique to one
+STABLE = 0
+PLATFORM = 1
+SESSION = 2
+VOLATILE = 3
+
+
+class PromptSection(BaseModel):
+    text: str
+    stability: int = STABLE
+
+
+def assemble_prompt(sections: list[PromptSection]) -> str:
+    """
+    Join prompt sections ordered from the most stable to the least stable.
+    Providers cache prompts by prefix, so volatile data at the end keeps the shared prefix cacheable.
+    Sections with the same stability keep their order.
+    """
+    return "".join(section.text for section in sorted(sections, key=lambda section: section.stability))
+
+
+class PromptCacheStats:
+    """Accumulates input and cached input tokens reported by the API per pipeline stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict[str, int]] = {}
+
+    def record(self, stage: str, usage) -> None:
+        """Record usage of a Responses API or Chat Completions API response."""
+        if usage is None:
+            return
+
+        input_tokens, _, cached_tokens = read_usage(usage)
+
+        with self._lock:
+            stage_stats = self._stage_stats(stage)
+            stage_stats["calls"] += 1
+            stage_stats["input_tokens"] += input_tokens
+            stage_stats["cached_tokens"] += cached_tokens
+
+    def record_unknown(self, stage: str) -> None:
+        """Record a call whose usage was never reported, e.g. a stream closed before its end."""
+        with self._lock:
+            stage_stats = self._stage_stats(stage)
+            stage_stats["calls"] += 1
+            stage_stats["usage_unknown"] += 1
+
+    def hit_rate(self, stage: str) -> float:
+        """Share of input tokens of the stage served from the provider prompt cache."""
+        with self._lock:
+            stage_stats = self._stages.get(stage)
+            if not stage_stats or not stage_stats["input_tokens"]:
+                return 0.0
+            return stage_stats["cached_tokens"] / stage_stats["input_tokens"]
+
+    def _stage_stats(self, stage: str) -> dict[str, int]:
+        return self._stages.setdefault(stage, {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "usage_unknown": 0})
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                stage: {
+                    **stage_stats,
+                    "hit_rate": stage_stats["cached_tokens"] / stage_stats["input_tokens"]
+                    if stage_stats["input_tokens"] else 0.0,
+                }
+                for stage, stage_stats in self._stages.items()
+            }
@@ -1,5 +1,14 @@
-from openai import OpenAI
-from models import AgentSchema
+from typing import TYPE_CHECKING, Callable
+
+from json_stream import JsonArrayItemExtractor
+from models import AgentSchema, AgentSchemaDiff, ToolSchema
+from plan_cache import PlanCache
+from prompt_assembly import PromptCacheStats
+from telemetry import Telemetry, maybe_span
+
+# openai takes most of the start-up time, it is imported by the caller creating the client
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 AGENT_PLANNER_SYSTEM_PROMPT = """
@@ -17,27 +26,141 @@ USER TASK:
 
 """
 
+AGENT_PLANNER_INCREMENTAL_PROMPT = """
+
+The user task was edited. Here is the agent planned for the previous version of the task:
+
+{previous_plan}
+
+Keep every tool that is still suitable for the new task exactly as it is, with the same name and fields.
+Change, add or remove only the tools affected by the edit.
+
+"""
+
+def _skip_unchanged_tools(on_tool_planned: Callable[[ToolSchema], None],
+                          previous_plan: AgentSchema) -> Callable[[ToolSchema], None]:
+    previous_tools = {tool.name: tool for tool in previous_plan.tools}
+
+    def on_changed_tool_planned(tool_schema: ToolSchema) -> None:
+        if previous_tools.get(tool_schema.name) != tool_schema:
+            on_tool_planned(tool_schema)
+
+    return on_changed_tool_planned
+
+
 class AgentSchemaPlanner:
 
-    def __init__(self, client: OpenAI, model: str):
+    def __init__(self,
+                 client: "OpenAI",
+                 model: str,
+                 plan_cache: PlanCache | None = None,
+                 cache_stats: PromptCacheStats | None = None,
+                 telemetry: Telemetry | None = None):
         self.client = client
         self.model = model
+        self.plan_cache = plan_cache
+        self.cache_stats = cache_stats
+        self.telemetry = telemetry
 
-    def plan(self, task: str) -> AgentSchema:
+    def plan(self,
+             task: str,
+             use_cache: bool = True,
+             on_tool_planned: Callable[[ToolSchema], None] | None = None) -> AgentSchema:
+        """
+        Plan an agent for the task. Plans for already seen tasks are served from the plan cache.
+        With `on_tool_planned` the plan is streamed and the callback receives every tool as soon as
+        its schema is complete, while the rest of the plan is still generated.
+        """
+        if self.plan_cache is not None and use_cache:
+            cached_plan = self.plan_cache.get(task, self.model)
+            if cached_plan is not None:
+                return cached_plan
 
-        response = self.client.responses.parse(
-            model=self.model,
-            input=[
-                {
-                    "role": "system",
-                    "content": AGENT_PLANNER_SYSTEM_PROMPT
-                },
+        agent_schema = self._plan(task, on_tool_planned=on_tool_planned)
+
+        if self.plan_cache is not None:
+            self.plan_cache.put(task, self.model, agent_schema)
+
+        return agent_schema
+
+    def plan_incremental(self,
+                         task: str,
+                         previous_task: str | None = None,
+                         on_tool_planned: Callable[[ToolSchema], None] | None = None) -> AgentSchemaDiff:
+        """
+        Plan an agent for an edited task and diff it against the cached plan of `previous_task`.
+        Without `previous_task`, or when it has no cached plan, the task is planned from scratch and every tool is new.
+        Only added and changed tools of the diff need to be regenerated, so only they are passed to
+        `on_tool_planned` while the plan is streamed.
+        """
+        if self.plan_cache is None:
+            raise ValueError("Incremental planning requires a plan cache")
+
+        cached_plan = self.plan_cache.get(task, self.model)
+        if cached_plan is not None:
+            return AgentSchemaDiff(agent_schema=cached_plan, unchanged_tools=cached_plan.tools)
+
+        # Only a task the caller names as edited is a sound baseline: an unrelated plan would bloat the prompt,
+        # bias the new plan towards its tools and get their files reused
+        previous_plan = self.plan_cache.get(previous_task, self.model) if previous_task is not None else None
+
+        if on_tool_planned is not None and previous_plan is not None:
+            on_tool_planned = _skip_unchanged_tools(on_tool_planned, previous_plan)
+
+        agent_schema = self._plan(task, previous_plan=previous_plan, on_tool_planned=on_tool_planned)
+        self.plan_cache.put(task, self.model, agent_schema)
+
+        return AgentSchemaDiff.between(previous_plan, agent_schema)
+
+    def _plan(self,
+              task: str,
+              previous_plan: AgentSchema | None = None,
+              on_tool_planned: Callable[[ToolSchema], None] | None = None) -> AgentSchema:
+
+        input_messages = [
+            {
+                "role": "system",
+                "content": AGENT_PLANNER_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": AGENT_PLANNER_USER_PROMPT.format(user_task=task),
+            },
+        ]
+
+        if previous_plan is not None:
+            input_messages.append(
                 {
                     "role": "user",
-                    "content": AGENT_PLANNER_USER_PROMPT.format(user_task=task),
-                },
-            ],
-            text_format=AgentSchema
-        )
+                    "content": AGENT_PLANNER_INCREMENTAL_PROMPT.format(previous_plan=previous_plan.model_dump_json()),
+                }
+            )
+
+        with maybe_span(self.telemetry, "agent_planner") as span:
+            if on_tool_planned is None:
+                response = self.client.responses.parse(
+                    model=self.model,
+                    input=input_messages,
+                    text_format=AgentSchema
+                )
+            else:
+                response = self._parse_streaming(input_messages, on_tool_planned)
+            span.record_usage(response.usage)
+
+        if self.cache_stats is not None:
+            self.cache_stats.record("agent_planner", response.usage)
 
-        return response.output_parsed
\ No newline at end of file
+        return response.output_parsed
+
+    def _parse_streaming(self, input_messages: list[dict], on_tool_planned: Callable[[ToolSchema], None]):
+        extractor = JsonArrayItemExtractor("tools")
+        with self.client.responses.stream(
+            model=self.model,
+            input=input_messages,
+            text_format=AgentSchema
+        ) as stream:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    for tool in extractor.feed(event.delta):
+                        on_tool_planned(ToolSchema.model_validate(tool))
+            return stream.get_final_response()
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class StageCheckpoint(BaseModel):
+    messages: list[dict] = []
+    # Index of the first step that was not completed
+    next_step: int = 0
+    counters: dict[str, int] = {}
+    finished: bool = False
+    result: Any = None
+
+
+class SessionCheckpoint:
+    """
+    Append-only log of a Planner/Coder session.
+    Every completed step appends only the messages added since the previous step and a step marker with
+    loop counters, so a crashed session can be restored to its last completed step. A torn line left
+    by a crash is skipped on restore.
+    """
+
+    def __init__(self, session_id: str, directory: str = "./agent_sessions/checkpoints"):
+        self.session_id = session_id
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.path.basename(session_id)}.jsonl")
+        self._lock = threading.Lock()
+        self._recorded_counts: dict[str, int] = {}
+        self._tail_checked = False
+
+    def start(self, **session) -> None:
+        """Record session parameters needed to resume it, unless the session was already started."""
+        if self.session() is None:
+            self._append([{"type": "session", **session}])
+
+    def session(self) -> dict | None:
+        for record in self._read():
+            if record["type"] == "session":
+                return {key: value for key, value in record.items() if key != "type"}
+        return None
+
+    def record_step(self, stage: str, step: int, messages: list[dict], **counters: int) -> None:
+        self._append([
+            *self._new_message_records(stage, messages),
+            {"type": "step", "stage": stage, "step": step, "message_count": len(messages), "counters": counters},
+        ])
+
+    def record_result(self, stage: str, result: Any, messages: list[dict]) -> None:
+        self._append([
+            *self._new_message_records(stage, messages),
+            {"type": "result", "stage": stage, "result": result, "message_count": len(messages)},
+        ])
+
+    def restore(self, stage: str) -> StageCheckpoint | None:
+        """State of the stage after its last completed step, or None if no step of the stage was completed."""
+        messages: dict[int, dict] = {}
+        checkpoint = None
+        for record in self._read():
+            if record.get("stage") != stage:
+                continue
+            if record["type"] == "message":
+                messages[record["index"]] = record["message"]
+            elif record["type"] == "step":
+                checkpoint = StageCheckpoint(next_step=record["step"] + 1, counters=record["counters"])
+                checkpoint.messages = [messages[index] for index in range(record["message_count"])]
+            elif record["type"] == "result":
+                checkpoint = StageCheckpoint(finished=True, result=record["result"],
+                                             next_step=checkpoint.next_step if checkpoint else 0)
+                checkpoint.messages = [messages[index] for index in range(record["message_count"])]
+
+        if checkpoint is not None:
+            self._recorded_counts[stage] = len(checkpoint.messages)
+        return checkpoint
+
+    def _new_message_records(self, stage: str, messages: list[dict]) -> list[dict]:
+        recorded_count = self._recorded_counts.get(stage, 0)
+        self._recorded_counts[stage] = len(messages)
+        return [
+            {"type": "message", "stage": stage, "index": index, "message": messages[index]}
+            for index in range(recorded_count, len(messages))
+        ]
+
+    def _append(self, records: list[dict]) -> None:
+        data = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        with self._lock:
+            if not self._tail_checked:
+                # Start on a new line after a torn write, so the first record isn't glued to it
+                if self._ends_with_torn_line():
+                    data = "\n" + data
+                self._tail_checked = True
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(data)
+                file.flush()
+
+    def _read(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def _ends_with_torn_line(self) -> bool:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        with open(self.path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) != b"\n"
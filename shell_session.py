@@ -0,0 +1,227 @@
+import base64
+import os
+import pty
+import select
+import shlex
+import signal
+import subprocess
+import termios
+import threading
+import time
+import uuid
+from typing import Callable
+
+from pydantic import BaseModel
+
+
+class ShellCommandResult(BaseModel):
+    output: str
+    exit_code: int | None = None
+    timed_out: bool = False
+    truncated_bytes: int = 0
+    duration_seconds: float = 0.0
+
+    def report(self) -> str:
+        if self.timed_out:
+            status = "Command timed out and was interrupted"
+        else:
+            status = f"Exit code: {self.exit_code}"
+        return f"{status}\n{self.output}"
+
+
+class ShellSession:
+    """
+    Long-lived shell on a pseudo-terminal that keeps cwd, environment and activated virtual environments
+    between commands. Each command is sent base64 encoded and evaluated in the shell, followed by a unique
+    sentinel line carrying its exit code, so the end of the output is found without a new process per call.
+    Output is capped to its head and tail, commands running over their timeout are interrupted with Ctrl-C
+    and the shell is restarted if it doesn't come back.
+    """
+
+    def __init__(self,
+                 working_directory: str | None = None,
+                 shell: str = "/bin/bash",
+                 default_timeout: float = 600.0,
+                 max_output_bytes: int = 64 * 1024,
+                 interrupt_grace_seconds: float = 5.0):
+        self.working_directory = working_directory or os.getcwd()
+        self.shell = shell
+        self.default_timeout = default_timeout
+        self.max_output_bytes = max_output_bytes
+        self.interrupt_grace_seconds = interrupt_grace_seconds
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen | None = None
+        self._master_fd: int | None = None
+
+    def run(self,
+            command: str,
+            timeout: float | None = None,
+            on_output: Callable[[bytes], None] | None = None) -> ShellCommandResult:
+        """Run a command in the session shell. `on_output` receives output chunks as they arrive."""
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+
+            started_at = time.perf_counter()
+            sentinel = f"__SHELL_SESSION_DONE_{uuid.uuid4().hex}__"
+            encoded_command = base64.b64encode(command.encode("utf-8")).decode("ascii")
+            self._write(
+                f"eval \"$(printf '%s' {encoded_command} | base64 -d)\" < /dev/null\n"
+                f"printf '\\n{sentinel}%s\\n' \"$?\"\n"
+            )
+
+            output, dropped_bytes, exit_code = self._read_until(sentinel, timeout or self.default_timeout, on_output)
+            timed_out = exit_code is None
+            if timed_out:
+                # Ctrl-C interrupts the foreground command and the shell survives it, but the terminal may
+                # discard the queued sentinel line, so a new sentinel is sent
+                self._write("\x03")
+                interrupt_sentinel = f"__SHELL_SESSION_INTERRUPTED_{uuid.uuid4().hex}__"
+                self._write(f"printf '\\n{interrupt_sentinel}%s\\n' \"$?\"\n")
+                interrupted_output, interrupted_dropped_bytes, interrupted_exit_code = self._read_until(
+                    interrupt_sentinel, self.interrupt_grace_seconds, on_output
+                )
+                output += b"\n".join(line for line in interrupted_output.split(b"\n")
+                                     if sentinel.encode("ascii") not in line)
+                dropped_bytes += interrupted_dropped_bytes
+                if interrupted_exit_code is None:
+                    self._stop()
+
+            text, truncated_bytes = self._cap(output, dropped_bytes)
+            return ShellCommandResult(output=text,
+                                      exit_code=exit_code,
+                                      timed_out=timed_out,
+                                      truncated_bytes=truncated_bytes,
+                                      duration_seconds=time.perf_counter() - started_at)
+
+    def reset(self) -> None:
+        """Restart the shell in the initial working directory with a clean environment."""
+        with self._lock:
+            self._stop()
+            self._start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+    def _start(self) -> None:
+        master_fd, slave_fd = pty.openpty()
+        attributes = termios.tcgetattr(slave_fd)
+        attributes[3] &= ~termios.ECHO
+        termios.tcsetattr(slave_fd, termios.TCSANOW, attributes)
+
+        env = os.environ.copy()
+        env.update({"TERM": "dumb", "PAGER": "cat", "GIT_PAGER": "cat", "PS1": "", "PS2": ""})
+        self._process = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc", "-i"],
+            stdin=slave_fd,
+            stdout=slave_fd,
+            stderr=slave_fd,
+            cwd=self.working_directory,
+            env=env,
+            start_new_session=True,
+        )
+        os.close(slave_fd)
+        self._master_fd = master_fd
+
+        # Interactive shells print prompts and may enable bracketed paste, so disable them and wait until ready
+        sentinel = f"__SHELL_SESSION_READY_{uuid.uuid4().hex}__"
+        self._write(
+            "PS1=''; PS2=''; unset PROMPT_COMMAND; bind 'set enable-bracketed-paste off' 2>/dev/null\n"
+            f"printf '\\n{sentinel}%s\\n' \"$?\"\n"
+        )
+        _, _, exit_code = self._read_until(sentinel, 10.0, None)
+        if exit_code is None:
+            self._stop()
+            raise RuntimeError(f"Shell {shlex.quote(self.shell)} did not start")
+
+    def _stop(self) -> None:
+        if self._process is not None:
+            if self._process.poll() is None:
+                try:
+                    os.killpg(self._process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            self._process.wait()
+            self._process = None
+        if self._master_fd is not None:
+            os.close(self._master_fd)
+            self._master_fd = None
+
+    def _write(self, data: str) -> None:
+        os.write(self._master_fd, data.encode("utf-8"))
+
+    def _read_until(self,
+                    sentinel: str,
+                    timeout: float,
+                    on_output: Callable[[bytes], None] | None) -> tuple[bytes, int, int | None]:
+        """
+        Read output until the sentinel line.
+        Returns the kept output, the number of bytes dropped from its middle and the exit code, None on timeout.
+        """
+        marker = f"\n{sentinel}".encode("ascii")
+        # Bytes kept back from long outputs for the marker search, the marker line ends with the exit code
+        held_back = len(marker) + 32
+        buffer = bytearray()
+        streamed = 0
+        dropped_bytes = 0
+        deadline = time.monotonic() + timeout
+
+        while True:
+            marker_position = buffer.find(marker)
+            if marker_position != -1:
+                line_end = buffer.find(b"\n", marker_position + len(marker))
+                if line_end != -1:
+                    exit_code_text = buffer[marker_position + len(marker):line_end].strip()
+                    if on_output is not None and marker_position > streamed:
+                        on_output(bytes(buffer[streamed:marker_position]))
+                    return bytes(buffer[:marker_position]), dropped_bytes, int(exit_code_text or -1)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return bytes(buffer), dropped_bytes, None
+
+            readable, _, _ = select.select([self._master_fd], [], [], remaining)
+            if not readable:
+                continue
+            try:
+                chunk = os.read(self._master_fd, 65536)
+            except OSError:
+                # The shell exited
+                return bytes(buffer), dropped_bytes, None
+            if not chunk:
+                return bytes(buffer), dropped_bytes, None
+            buffer += chunk.replace(b"\r\n", b"\n")
+
+            if on_output is not None:
+                # The marker may arrive split between chunks, so stream only up to where it could start
+                stream_end = len(buffer)
+                newline_position = buffer.find(b"\n", max(streamed, len(buffer) - held_back))
+                while newline_position != -1:
+                    if marker.startswith(bytes(buffer[newline_position:newline_position + len(marker)])):
+                        stream_end = newline_position
+                        break
+                    newline_position = buffer.find(b"\n", newline_position + 1)
+                if stream_end > streamed:
+                    on_output(bytes(buffer[streamed:stream_end]))
+                    streamed = stream_end
+
+            # Keep memory bounded by dropping the middle of long outputs, the head and the tail are reported
+            half = self.max_output_bytes // 2
+            if len(buffer) > self.max_output_bytes + 2 * held_back:
+                cut = len(buffer) - half - held_back
+                dropped_bytes += cut - half
+                streamed = max(half, streamed - (cut - half))
+                del buffer[half:cut]
+
+    def _cap(self, output: bytes, dropped_bytes: int) -> tuple[str, int]:
+        half = self.max_output_bytes // 2
+        if len(output) > self.max_output_bytes:
+            dropped_bytes += len(output) - 2 * half
+            output = output[:half] + output[-half:]
+        if not dropped_bytes:
+            return output.decode("utf-8", errors="replace"), 0
+        text = (output[:half].decode("utf-8", errors="replace")
+                + f"\n... [{dropped_bytes} bytes truncated] ...\n"
+                + output[half:].decode("utf-8", errors="replace"))
+        return text, dropped_bytes
@@ -1,11 +1,25 @@
+import argparse
+import asyncio
 import json
 import logging
+import sys
+import threading
+import time
 from datetime import datetime
-import platform
+from types import SimpleNamespace
+from typing import AsyncIterator
 import os
 
 import dotenv
 
+from artifact_store import ArtifactStore
+from context_compactor import ContextCompactor
+from session_checkpoint import SessionCheckpoint
+from shell_session import ShellSession
+from system_context import get_environment_info, get_platform_info, get_time_info
+from prompt_assembly import (PromptSection, PromptCacheStats, assemble_prompt, PLATFORM, SESSION, VOLATILE)
+from telemetry import Telemetry, maybe_span
+from tool_dispatcher import ToolDispatcher
 from llm.call import LLMClient
 from tool_v3.open_ai_tool_decorator import openai_tool
 from tools.ask_user_tool import ask_user_tool
@@ -16,154 +30,36 @@ dotenv.load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# System prompts are assembled from the most stable sections to the least stable ones,
+# so the shared prefix stays byte-identical between requests and hits the provider prompt cache.
 
-def get_system_context():
-    system_info = {
-        "system": platform.system(),
-        "release": platform.release(),
-        "version": platform.version(),
-        "architecture": platform.architecture()[0],
-        "processor": platform.processor(),
-        "machine": platform.machine(),
-        "python_version": platform.python_version()
-    }
-
-    env_info = {
-        "current_directory": os.getcwd(),
-        "username": os.getenv('USERNAME') or os.getenv('USER'),
-        "home_directory": os.path.expanduser('~'),
-        "temp_directory": os.getenv('TEMP') or os.getenv('TMP')
-    }
-
-    current_time = datetime.now()
-    time_info = {
-        "current_datetime": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-        "current_date": current_time.strftime("%Y-%m-%d"),
-        "current_time": current_time.strftime("%H:%M:%S"),
-        "timezone": str(current_time.astimezone().tzinfo),
-        "weekday": current_time.strftime("%A"),
-        "is_weekend": current_time.weekday() >= 5
-    }
-
-    context = {
-        "platform_info": system_info,
-        "environment_info": env_info,
-        "time_info": time_info,
-        "timestamp": current_time.isoformat()
-    }
-
-    return context
-
-
-system_context = get_system_context()
-
-SYSTEM_INFO_PROMPT = """
+ASSISTANT_ROLE_SECTION = """
     You are helpfully assistant\n
-    
+    """
+
+PLANNER_TOOLS_SECTION = """
     TOOLS INFORMATION:
     
     - `ask_user_tool` - ask user if additional information required. Ask the user just one time.
     - `finish_task_tool` - call this tool if you are ready to finish the task. Pass the final response as tool parameter.
-    
-    DEPENDENCIES:
-    
-    SYSTEM INFORMATION:
+    """
 
-    PLATFORM INFO:
-    - Operating System: {system} {release}
-    - OS Version: {version}
-    - Architecture: {architecture}
-    - Processor: {processor}
-    - Python Version: {python_version}
-    
-    ENVIRONMENT INFO:
-    - Current Directory: {current_directory}
-    - User: {username}
-    - Home Directory: {home_directory}
-    
-    TIME INFORMATION:
-    - Current Date and Time: {current_datetime}
-    - Timezone: {timezone}
-    - Weekday: {weekday}
-    - Is Weekend: {is_weekend}
-    
-    Use this information for:
-    1. Providing contextually relevant responses
-    2. Considering temporal aspects (season, time of day)
-    3. Adapting to the user's operating system
-    4. Taking into account file structure when working with paths
-    
-""".format(
-    system=system_context['platform_info']['system'],
-    release=system_context['platform_info']['release'],
-    version=system_context['platform_info']['version'],
-    architecture=system_context['platform_info']['architecture'],
-    processor=system_context['platform_info']['processor'],
-    python_version=system_context['platform_info']['python_version'],
-    current_directory=system_context['environment_info']['current_directory'],
-    username=system_context['environment_info']['username'],
-    home_directory=system_context['environment_info']['home_directory'],
-    current_datetime=system_context['time_info']['current_datetime'],
-    timezone=system_context['time_info']['timezone'],
-    weekday=system_context['time_info']['weekday'],
-    is_weekend=system_context['time_info']['is_weekend']
-)
-
-CODER_SYSTEM_PROMPT = """
-    You are helpfully assistant\n
-    
-    SYSTEM INFORMATION:
-
-    PLATFORM INFO:
-    - Operating System: {system} {release}
-    - OS Version: {version}
-    - Architecture: {architecture}
-    - Processor: {processor}
-    - Python Version: {python_version}
-    
-    ENVIRONMENT INFO:
-    - Current Directory: {current_directory}
-    - User: {username}
-    - Home Directory: {home_directory}
-    
-    TIME INFORMATION:
-    - Current Date and Time: {current_datetime}
-    - Timezone: {timezone}
-    - Weekday: {weekday}
-    - Is Weekend: {is_weekend}
-    
+CODER_DEPENDENCIES_SECTION = """
     DEPENDENCIES:
     
     You work in `uv` environment. If some dependencies need to be checked or install just use `uv add <requirement>` 
     or `uv add -r requirements.txt`. Do not create separate environments.
-    
-    Use this information for:
+    """
+
+CONTEXT_USAGE_SECTION = """
+    Use the system information below for:
     1. Providing contextually relevant responses
     2. Considering temporal aspects (season, time of day)
     3. Adapting to the user's operating system
     4. Taking into account file structure when working with paths
-    
-    """.format(
-    system=system_context['platform_info']['system'],
-    release=system_context['platform_info']['release'],
-    version=system_context['platform_info']['version'],
-    architecture=system_context['platform_info']['architecture'],
-    processor=system_context['platform_info']['processor'],
-    python_version=system_context['platform_info']['python_version'],
-    current_directory=system_context['environment_info']['current_directory'],
-    username=system_context['environment_info']['username'],
-    home_directory=system_context['environment_info']['home_directory'],
-    current_datetime=system_context['time_info']['current_datetime'],
-    timezone=system_context['time_info']['timezone'],
-    weekday=system_context['time_info']['weekday'],
-    is_weekend=system_context['time_info']['is_weekend']
-)
-
-system = {
-    "role": "system",
-    "content": """
-    You are helpfully assistant\n
-    
+    """
+
+PLATFORM_INFO_TEMPLATE = """
     SYSTEM INFORMATION:
 
     PLATFORM INFO:
@@ -172,52 +68,83 @@ system = {
     - Architecture: {architecture}
     - Processor: {processor}
     - Python Version: {python_version}
-    
+    """
+
+
+def build_platform_info_section() -> str:
+    return PLATFORM_INFO_TEMPLATE.format(**get_platform_info())
+
+
+ENVIRONMENT_INFO_TEMPLATE = """
     ENVIRONMENT INFO:
     - Current Directory: {current_directory}
     - User: {username}
     - Home Directory: {home_directory}
-    
+    """
+
+
+def build_environment_info_section(current_directory: str) -> str:
+    environment_info = get_environment_info()
+    return ENVIRONMENT_INFO_TEMPLATE.format(
+        current_directory=current_directory,
+        username=environment_info['username'],
+        home_directory=environment_info['home_directory'],
+    )
+
+
+TIME_INFO_TEMPLATE = """
     TIME INFORMATION:
     - Current Date and Time: {current_datetime}
     - Timezone: {timezone}
     - Weekday: {weekday}
     - Is Weekend: {is_weekend}
     
-    DEPENDENCIES:
-    
-    You work in `uv` environment. If some dependencies need to be checked or install just use `uv add <requirement>` 
-    or `uv add -r requirements.txt`. Do not create separate environments.
-    
-    Use this information for:
-    1. Providing contextually relevant responses
-    2. Considering temporal aspects (season, time of day)
-    3. Adapting to the user's operating system
-    4. Taking into account file structure when working with paths
-    
-    """.format(
-        system=system_context['platform_info']['system'],
-        release=system_context['platform_info']['release'],
-        version=system_context['platform_info']['version'],
-        architecture=system_context['platform_info']['architecture'],
-        processor=system_context['platform_info']['processor'],
-        python_version=system_context['platform_info']['python_version'],
-        current_directory=system_context['environment_info']['current_directory'],
-        username=system_context['environment_info']['username'],
-        home_directory=system_context['environment_info']['home_directory'],
-        current_datetime=system_context['time_info']['current_datetime'],
-        timezone=system_context['time_info']['timezone'],
-        weekday=system_context['time_info']['weekday'],
-        is_weekend=system_context['time_info']['is_weekend']
-    )
-}
+"""
+
+
+def build_time_info_section() -> str:
+    """Time info is read on every call, it is the only section changing between requests."""
+    return TIME_INFO_TEMPLATE.format(**get_time_info())
+
+
+def build_planner_system_prompt(current_directory: str | None = None) -> str:
+    return assemble_prompt([
+        PromptSection(text=ASSISTANT_ROLE_SECTION),
+        PromptSection(text=PLANNER_TOOLS_SECTION),
+        PromptSection(text=CONTEXT_USAGE_SECTION),
+        PromptSection(text=build_platform_info_section(), stability=PLATFORM),
+        PromptSection(text=build_environment_info_section(current_directory or os.getcwd()), stability=SESSION),
+        PromptSection(text=build_time_info_section(), stability=VOLATILE),
+    ])
+
+
+def build_coder_system_prompt(current_directory: str) -> str:
+    return assemble_prompt([
+        PromptSection(text=ASSISTANT_ROLE_SECTION),
+        PromptSection(text=CODER_DEPENDENCIES_SECTION),
+        PromptSection(text=CONTEXT_USAGE_SECTION),
+        PromptSection(text=build_platform_info_section(), stability=PLATFORM),
+        PromptSection(text=build_environment_info_section(current_directory), stability=SESSION),
+        PromptSection(text=build_time_info_section(), stability=VOLATILE),
+    ])
+
 
 requirements_clarification_prompt = "Если у тебя есть уточняющие вопросы, задай их через инструмент `ask_user_tool`"
 
 
 class Planner:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self,
+                 llm_client: LLMClient,
+                 context_compactor: ContextCompactor | None = None,
+                 cache_stats: PromptCacheStats | None = None,
+                 telemetry: Telemetry | None = None,
+                 parallel_tools: set[str] | None = None):
         self.llm_client = llm_client
+        self.context_compactor = context_compactor
+        self.cache_stats = cache_stats
+        self.telemetry = telemetry
+        # Tools whose calls of one step may run concurrently; the planner's own tools all have to stay in order
+        self.parallel_tools = parallel_tools or set()
         self.logger = get_logger("baseline-planner")
 
     @openai_tool
@@ -229,13 +156,17 @@ class Planner:
         """
         return answer
 
-    def plan(self, task: str, clarify_requirements: bool = True, ask_user_times: int = 1, max_iter: int = 100) -> tuple[
-        str, list[dict[str, str]]]:
+    def plan(self,
+             task: str,
+             clarify_requirements: bool = True,
+             ask_user_times: int = 1,
+             max_iter: int = 100,
+             checkpoint: SessionCheckpoint | None = None) -> tuple[str, list[dict[str, str]]]:
 
         messages = [
             {
                 "role": "system",
-                "content": SYSTEM_INFO_PROMPT
+                "content": build_planner_system_prompt()
             },
             {
                 "role": "user",
@@ -260,81 +191,110 @@ class Planner:
             _tools.append(ask_user_tool)
 
         user_asked_times: int = 0
+        start_step = 0
+
+        restored = checkpoint.restore("planner") if checkpoint is not None else None
+        if restored is not None:
+            if restored.finished:
+                return restored.result, restored.messages
+            messages = restored.messages
+            start_step = restored.next_step
+            user_asked_times = restored.counters.get("user_asked_times", 0)
+            self.logger.info("Planner resumed at step %s", start_step)
+
+        def limit_user_questions(tool_name: str, args: dict) -> str | None:
+            nonlocal user_asked_times
+            if tool_name != "ask_user_tool":
+                return None
+            if user_asked_times > 0:
+                return "Exceeded attempts to clarify info from user"
+            user_asked_times += 1
+            return None
+
+        with ToolDispatcher(_tools, parallel_tools=self.parallel_tools, guard=limit_user_questions,
+                            logger=self.logger, telemetry=self.telemetry, stage="planner") as dispatcher:
+
+            for step in range(start_step, max_iter):
+
+                self.logger.info(f"Planner step {step} / {max_iter}")
+
+                request_messages = messages
+                if self.context_compactor is not None:
+                    request_messages, report = self.context_compactor.compact(messages)
+                    self.logger.info("Planner context: %s tokens, %s tokens saved by compaction",
+                                     report.tokens_after, report.tokens_saved)
+
+                with maybe_span(self.telemetry, "planner", step=step) as span:
+                    response = self.llm_client.run_llm_with_tools(
+                        messages=request_messages,
+                        tools=_tools,
+                        tool_choice="required",
+                    )
+                    span.record_usage(response.usage)
 
-        for step in range(max_iter):
-
-            self.logger.info(f"Planner step {step} / {max_iter}")
+                if self.cache_stats is not None:
+                    self.cache_stats.record("planner", response.usage)
 
-            response = llm_client.run_llm_with_tools(
-                messages=messages,
-                tools=_tools,
-                tool_choice="required",
-            )
+                msg = response.choices[0].message
 
-            msg = response.choices[0].message
+                assistant_message = {"role": "assistant"}
 
-            assistant_message = {"role": "assistant"}
+                if msg.content:
+                    assistant_message["content"] = msg.content
 
-            if msg.content:
-                assistant_message["content"] = msg.content
+                if msg.tool_calls:
+                    assistant_message["tool_calls"] = [tc.model_dump() for tc in msg.tool_calls]
 
-            if msg.tool_calls:
-                assistant_message["tool_calls"] = [tc.model_dump() for tc in msg.tool_calls]
+                messages.append(assistant_message)
 
-            messages.append(assistant_message)
+                if msg.tool_calls:
+                    for call_result in dispatcher.dispatch(msg.tool_calls, step=step):
 
-            if msg.tool_calls:
-                for tc in msg.tool_calls:
-
-                    tool = {tool.__name__: tool for tool in _tools}[
-                        tc.function.name
-                    ]
-                    args = json.loads(tc.function.arguments)
+                        if call_result.tool_name == "finish_task_tool":
+                            self.logger.info("Planner give the final answer: %s", call_result.result)
+                            if checkpoint is not None:
+                                checkpoint.record_result("planner", call_result.result, messages)
+                            return call_result.result, messages.copy()
 
-                    if not tool:
-                        result = f"Unknown tool: {tool.__name__}"
-                        self.logger.error(f"Unknown tool requested: {tool.__name__}")
-                    else:
-                        try:
-                            self.logger.info(
-                                "Running tool: %s with args: %s", tool.__name__, args
-                            )
-                            if tool.__name__ == "ask_user_tool":
-                                if user_asked_times > 0:
-                                    result = f"Exceeded attempts to clarify info from user"
-                                else:
-                                    result = tool(**args)
-                                    user_asked_times += 1
-                            else:
-                                result = tool(**args)
-                            self.logger.info(
-                                "Tool %s completed. Tool result %s",
-                                tool.__name__,
-                                result,
-                            )
-                        except Exception as e:
-                            result = f"Tool execution failed: {e}"
-                            self.logger.exception("Tool %s failed:", tool.__name__)
-
-                    if tool.__name__ == "finish_task_tool":
-                        self.logger.info("Planner give the final answer: %s", result)
-                        return result, messages.copy()
+                        messages.append(
+                            {
+                                "role": "tool",
+                                "tool_call_id": call_result.tool_call_id,
+                                "content": str(call_result.result),
+                            }
+                        )
 
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "tool_call_id": tc.id,
-                            "content": str(result),
-                        }
-                    )
-
-                continue
+                if checkpoint is not None:
+                    checkpoint.record_step("planner", step, messages, user_asked_times=user_asked_times)
 
         raise RuntimeError("Planner can't finish the task")
 
 class Coder:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self,
+                 llm_client: LLMClient,
+                 context_compactor: ContextCompactor | None = None,
+                 artifact_store: ArtifactStore | None = None,
+                 cache_stats: PromptCacheStats | None = None,
+                 tool_timeouts: dict[str, float] | None = None,
+                 working_directory: str | None = None,
+                 allow_user_questions: bool = True,
+                 telemetry: Telemetry | None = None,
+                 shell_session: ShellSession | None = None,
+                 parallel_tools: set[str] | None = None):
         self.llm_client = llm_client
+        self.working_directory = working_directory or os.getcwd()
+        self.allow_user_questions = allow_user_questions
+        self.context_compactor = context_compactor
+        self.artifact_store = artifact_store
+        self.cache_stats = cache_stats
+        self.telemetry = telemetry
+        # A hung terminal command must not block the step forever
+        self.tool_timeouts = tool_timeouts if tool_timeouts is not None else {"terminal_tool": 600.0}
+        # With a persistent shell, terminal commands run one by one in the same shell and keep its state
+        self.shell_session = shell_session
+        # Tools whose calls of one step run concurrently. terminal_tool stays sequential by default: commands of
+        # one step usually build on each other, e.g. mkdir, write, run. A persistent shell runs them one by one anyway
+        self.parallel_tools = parallel_tools if parallel_tools is not None else {"read_artifact_tool"}
         self.logger = get_logger("coder")
 
     @openai_tool
@@ -346,11 +306,41 @@ class Coder:
         """
         return answer
 
-    def code(self, user_task: str, plan: str, max_iters: int = 100):
+    @openai_tool
+    def read_artifact_tool(self, artifact_id: str, offset: int = 0, length: int = 4000) -> str:
+        """
+            Read a page of a large tool output stored as an artifact
+            Args:
+                artifact_id (str): Artifact id from the tool output handle
+                offset (int): Byte offset to start reading from
+                length (int): Number of bytes to read
+        """
+        return self.artifact_store.read(artifact_id, offset=offset, length=length)
+
+    @openai_tool
+    def terminal_tool(self, command: str) -> str:
+        """
+            Execute a command in the terminal. The terminal session is persistent: the current directory,
+            environment variables and activated virtual environments are kept between commands
+            Args:
+                command (str): Shell command to execute
+        """
+        return self.shell_session.run(command, timeout=self.tool_timeouts.get("terminal_tool")).report()
+
+    @openai_tool
+    def reset_terminal_tool(self) -> str:
+        """
+            Restart the terminal session in the initial directory with a clean environment.
+            Use it if the terminal is stuck or its state is broken
+        """
+        self.shell_session.reset()
+        return f"Terminal session restarted in {self.shell_session.working_directory}"
+
+    def code(self, user_task: str, plan: str, max_iters: int = 100, checkpoint: SessionCheckpoint | None = None):
         messages = [
             {
                 "role": "system",
-                "content": CODER_SYSTEM_PROMPT
+                "content": build_coder_system_prompt(self.working_directory)
             },
             {
                 "role": "user",
@@ -378,116 +368,336 @@ class Coder:
             }
         ]
 
-        for i in range(max_iters):
-
-            self.logger.info(f"Coder step {i} / {max_iters}")
-
-            if i in {0, 1}:
-                tools = []
-                response = llm_client.client.chat.completions.create(
-                    messages=messages,
-                    model=llm_client.model,
-                )
-            else:
-                tools = [
-                    ask_user_tool,
-                    terminal_tool,
-                    self.finish_task_tool,
-                ]
-                response = llm_client.run_llm_with_tools(
-                    messages=messages,
-                    tools=tools,
-                    tool_choice="required",
-                )
-
-            msg = response.choices[0].message
+        tools = [
+            terminal_tool if self.shell_session is None else self.terminal_tool,
+            self.finish_task_tool,
+        ]
+        timeouts = dict(self.tool_timeouts)
+        if self.shell_session is not None:
+            tools.append(self.reset_terminal_tool)
+            # The shell session interrupts commands on its own timeout and stays usable afterwards
+            timeouts.pop("terminal_tool", None)
+        if self.allow_user_questions:
+            tools.append(ask_user_tool)
+        if self.artifact_store is not None:
+            tools.append(self.read_artifact_tool)
+
+        start_step = 0
+        restored = checkpoint.restore("coder") if checkpoint is not None else None
+        if restored is not None:
+            if restored.finished:
+                return restored.result, restored.messages
+            messages = restored.messages
+            start_step = restored.next_step
+            self.logger.info("Coder resumed at step %s", start_step)
+
+        with ToolDispatcher(
+            tools,
+            parallel_tools=self.parallel_tools,
+            timeouts=timeouts,
+            logger=logger,
+            telemetry=self.telemetry,
+            stage="coder",
+        ) as dispatcher:
+
+            for i in range(start_step, max_iters):
+
+                self.logger.info(f"Coder step {i} / {max_iters}")
+
+                request_messages = messages
+                if self.context_compactor is not None:
+                    request_messages, report = self.context_compactor.compact(messages)
+                    self.logger.info("Coder context: %s tokens, %s tokens saved by compaction",
+                                     report.tokens_after, report.tokens_saved)
+
+                with maybe_span(self.telemetry, "coder", step=i) as span:
+                    if i in {0, 1}:
+                        response = self.llm_client.client.chat.completions.create(
+                            messages=request_messages,
+                            model=self.llm_client.model,
+                        )
+                    else:
+                        response = self.llm_client.run_llm_with_tools(
+                            messages=request_messages,
+                            tools=tools,
+                            tool_choice="required",
+                        )
+                    span.record_usage(response.usage)
 
-            assistant_message = {"role": "assistant"}
+                if self.cache_stats is not None:
+                    self.cache_stats.record("coder", response.usage)
 
-            if msg.content:
-                assistant_message["content"] = msg.content
+                msg = response.choices[0].message
 
-            if msg.tool_calls:
-                assistant_message["tool_calls"] = [
-                    tc.model_dump() for tc in msg.tool_calls
-                ]
+                assistant_message = {"role": "assistant"}
 
-            messages.append(assistant_message)
+                if msg.content:
+                    assistant_message["content"] = msg.content
 
-            if msg.tool_calls:
-                for tc in msg.tool_calls:
-                    tool = {tool.__name__: tool for tool in tools}[
-                        tc.function.name
+                if msg.tool_calls:
+                    assistant_message["tool_calls"] = [
+                        tc.model_dump() for tc in msg.tool_calls
                     ]
-                    args = json.loads(tc.function.arguments)
 
-                    if not tool:
-                        result = f"Unknown tool: {tool.__name__}"
-                        logger.error(f"Unknown tool requested: {tool.__name__}")
-                    else:
-                        try:
-                            logger.info(
-                                "Running tool: %s with args: %s", tool.__name__, args
-                            )
-                            result = tool(**args)
-                            logger.info(
-                                "Tool %s completed. Tool result %s",
-                                tool.__name__,
-                                result,
-                            )
-                        except Exception as e:
-                            result = f"Tool execution failed: {e}"
-                            logger.exception("Tool %s failed:", tool.__name__)
+                messages.append(assistant_message)
+
+                if msg.tool_calls:
+                    for call_result in dispatcher.dispatch(msg.tool_calls, step=i):
+                        content = str(call_result.result)
+                        if self.artifact_store is not None and call_result.tool_name not in {"finish_task_tool",
+                                                                                             "read_artifact_tool"}:
+                            content = self.artifact_store.store(content)
+
+                        messages.append(
+                            {
+                                "role": "tool",
+                                "tool_call_id": call_result.tool_call_id,
+                                "content": content,
+                            }
+                        )
+
+                        if call_result.tool_name == "finish_task_tool":
+                            logger.info(f"Finishing tool {call_result.tool_name}")
+                            if checkpoint is not None:
+                                checkpoint.record_result("coder", call_result.result, messages)
+                            return call_result.result, messages
+
+                    if checkpoint is not None:
+                        checkpoint.record_step("coder", i, messages)
+                    continue
+
+                if i in {0}:
+                    messages.append(
+                        {
+                            "role": "user",
+                            "content": "Какие действия еще нужно сделать, чтобы код заработал?"
+                        }
+                    )
 
+                if i in {1}:
                     messages.append(
                         {
-                            "role": "tool",
-                            "tool_call_id": tc.id,
-                            "content": str(result),
+                            "role": "user",
+                            "content": """
+                            Выполнить все необходимые действия, чтобы сделать код рабочим.
+                            Для этого я хочу получить необходимые артефакты в папке '{cwd}/agent_artifacts_{date_stamp}'. Предварительно проверь наличие этой
+                            директории.
+                        
+                            Доступные инструменты:
+                            - `ask_user` - спросить детали у пользователя
+                            - `terminal_tool` - выполнение команд в терминале
+                            - `finish_task_tool` - вызови этот инструмент, когда захочешь окончательно завершить запрос пользователя
+                        
+                            При выполнении различных команд через `terminal_tool` не группируй много команд в одну
+                        
+                            Завершение:
+                            Вызови `finish_task_tool` когда все пункты для реализации задачи пользователя выполнены.
+                            """.format(cwd=self.working_directory, date_stamp=datetime.now().strftime("%d%m%Y_%H%M"))
                         }
                     )
 
-                    if tool.__name__ == "finish_task_tool":
-                        logger.info(f"Finishing tool {tool.__name__}")
-                        return result, messages
+                if checkpoint is not None:
+                    checkpoint.record_step("coder", i, messages)
+
+        raise RuntimeError("Could not find a suitable tool")
+
+
+class LimitedLLMClient:
+    """Wraps LLMClient so that sessions sharing it make at most `semaphore` concurrent LLM calls."""
+
+    def __init__(self, llm_client: LLMClient, semaphore: threading.BoundedSemaphore):
+        self._llm_client = llm_client
+        self._semaphore = semaphore
+        self.model = llm_client.model
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self._create)))
+
+    def run_llm_with_tools(self, **kwargs):
+        with self._semaphore:
+            return self._llm_client.run_llm_with_tools(**kwargs)
+
+    def _create(self, **kwargs):
+        with self._semaphore:
+            return self._llm_client.client.chat.completions.create(**kwargs)
+
+
+def read_tasks(tasks_file_path: str) -> list[dict[str, str]]:
+    """Read tasks from JSONL. A line holds `task`, or `title`/`body` like requests.jsonl, and an optional id."""
+    tasks = []
+    with open(tasks_file_path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file):
+            if not line.strip():
                 continue
+            record = json.loads(line)
+            task = record.get("task") or "\n\n".join(
+                part for part in (record.get("title"), record.get("body")) if part
+            )
+            session_id = str(record.get("request_id") or record.get("id") or f"task-{line_number:04d}")
+            tasks.append({"session_id": session_id, "task": task})
+    return tasks
+
+
+def run_planner_coder(llm_client: LLMClient,
+                      task: str,
+                      working_directory: str,
+                      artifact_directory: str,
+                      interactive: bool = False,
+                      telemetry: Telemetry | None = None,
+                      checkpoint: SessionCheckpoint | None = None) -> dict:
+    """Run Planner and Coder for one task. Steps completed before are restored from the checkpoint."""
+    context_compactor = ContextCompactor(token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "32000")))
+    cache_stats = PromptCacheStats()
+
+    # Extra tools known to be safe to run side by side, e.g. "terminal_tool" for read-only investigation tasks
+    extra_parallel_tools = {name.strip() for name in os.getenv("PARALLEL_TOOLS", "").split(",") if name.strip()}
+
+    planner = Planner(llm_client, context_compactor=context_compactor, cache_stats=cache_stats, telemetry=telemetry,
+                      parallel_tools=extra_parallel_tools)
+    planned_task, _ = planner.plan(task, clarify_requirements=interactive, checkpoint=checkpoint)
+    logger.info("Planned task: %s", planned_task)
+
+    # The plain terminal_tool runs in the process directory, so a session with its own directory, e.g. one of
+    # concurrent batch sessions, always gets a shell started there
+    shell_session = None
+    if (os.getenv("PERSISTENT_SHELL", "true").lower() == "true"
+            or os.path.abspath(working_directory) != os.getcwd()):
+        shell_session = ShellSession(working_directory)
+
+    coder = Coder(llm_client,
+                  context_compactor=context_compactor,
+                  artifact_store=ArtifactStore(artifact_directory),
+                  cache_stats=cache_stats,
+                  working_directory=working_directory,
+                  allow_user_questions=interactive,
+                  telemetry=telemetry,
+                  shell_session=shell_session,
+                  parallel_tools={"read_artifact_tool"} | extra_parallel_tools)
+    try:
+        coder_result, _ = coder.code(user_task=task, plan=planned_task, checkpoint=checkpoint)
+    finally:
+        if shell_session is not None:
+            shell_session.close()
+
+    return {"plan": planned_task, "result": str(coder_result), "prompt_cache": cache_stats.summary()}
+
+
+def run_session(llm_client: LLMClient,
+                session_id: str,
+                task: str,
+                sessions_directory: str,
+                telemetry: Telemetry | None = None) -> dict:
+    """
+    Run Planner and Coder for one task in its own working directory without asking the user.
+    Sessions are checkpointed, so running a session id again continues it from its last completed step.
+    """
+    # Session ids come from the tasks file, so keep the session inside the sessions directory
+    session_id = os.path.basename(session_id.rstrip("/\\"))
+    if session_id in {"", ".", "..", "checkpoints"}:
+        raise ValueError(f"Invalid session id '{session_id}'")
+
+    working_directory = os.path.abspath(os.path.join(sessions_directory, session_id))
+    os.makedirs(working_directory, exist_ok=True)
+
+    checkpoint = SessionCheckpoint(session_id, os.path.join(sessions_directory, "checkpoints"))
+    checkpoint.start(task=task,
+                     working_directory=working_directory,
+                     artifact_directory=os.path.join(working_directory, "tool_outputs"),
+                     interactive=False)
+    return resume(llm_client, checkpoint, telemetry=telemetry)
+
+
+def resume(llm_client: LLMClient, checkpoint: SessionCheckpoint | str, telemetry: Telemetry | None = None,
+           checkpoint_directory: str = "./agent_sessions/checkpoints") -> dict:
+    """Continue a checkpointed session, given by its checkpoint or session id, from its last completed step."""
+    if isinstance(checkpoint, str):
+        checkpoint = SessionCheckpoint(checkpoint, checkpoint_directory)
+
+    session = checkpoint.session()
+    if session is None:
+        raise KeyError(f"No checkpoint for session '{checkpoint.session_id}' in {checkpoint.directory}")
+
+    return run_planner_coder(llm_client,
+                             task=session["task"],
+                             working_directory=session["working_directory"],
+                             artifact_directory=session["artifact_directory"],
+                             interactive=session["interactive"],
+                             telemetry=telemetry,
+                             checkpoint=checkpoint)
+
+
+async def run_sessions(llm_client: LLMClient,
+                       tasks: list[dict[str, str]],
+                       sessions_directory: str = "./agent_sessions",
+                       max_concurrent_sessions: int = 4,
+                       max_concurrent_llm_calls: int = 8,
+                       telemetry: Telemetry | None = None) -> AsyncIterator[dict]:
+    """
+    Drive many Planner -> Coder sessions at once and yield their results as they finish.
+    Sessions run in worker threads; LLM calls of all sessions are bounded by one shared semaphore.
+    """
+    limited_llm_client = LimitedLLMClient(llm_client, threading.BoundedSemaphore(max_concurrent_llm_calls))
+    sessions_semaphore = asyncio.Semaphore(max_concurrent_sessions)
+
+    async def run_one(session_id: str, task: str) -> dict:
+        async with sessions_semaphore:
+            started_at = time.perf_counter()
+            try:
+                output = await asyncio.to_thread(run_session, limited_llm_client, session_id, task,
+                                                 sessions_directory, telemetry)
+                status = "done"
+            except Exception as e:
+                logger.exception("Session %s failed", session_id)
+                output = {"error": f"{type(e).__name__}: {e}"}
+                status = "failed"
+            return {
+                "session_id": session_id,
+                "status": status,
+                "duration_seconds": round(time.perf_counter() - started_at, 3),
+                **output,
+            }
 
-            if i in {0}:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": "Какие действия еще нужно сделать, чтобы код заработал?"
-                    }
-                )
+    pending = [asyncio.create_task(run_one(task["session_id"], task["task"])) for task in tasks]
+    for finished in asyncio.as_completed(pending):
+        yield await finished
 
-            if i in {1}:
-                messages.append(
-                    {
-                        "role": "user",
-                        "content": """
-                        Выполнить все необходимые действия, чтобы сделать код рабочим.
-                        Для этого я хочу получить необходимые артефакты в папке '{cwd}/agent_artifacts_{date_stamp}'. Предварительно проверь наличие этой
-                        директории.
-                    
-                        Доступные инструменты:
-                        - `ask_user` - спросить детали у пользователя
-                        - `terminal_tool` - выполнение команд в терминале
-                        - `finish_task_tool` - вызови этот инструмент, когда захочешь окончательно завершить запрос пользователя
-                    
-                        При выполнении различных команд через `terminal_tool` не группируй много команд в одну
-                    
-                        Завершение:
-                        Вызови `finish_task_tool` когда все пункты для реализации задачи пользователя выполнены.
-                        """.format(cwd=os.getcwd(), date_stamp=datetime.now().strftime("%d%m%Y_%H%M"))
-                    }
-                )
 
-        raise RuntimeError("Could not find a suitable tool")
+async def run_sessions_to_jsonl(llm_client: LLMClient, tasks_file_path: str, output_file_path: str | None,
+                                **kwargs) -> None:
+    output_file = open(output_file_path, "a", encoding="utf-8") if output_file_path else sys.stdout
+    try:
+        async for session_result in run_sessions(llm_client, read_tasks(tasks_file_path), **kwargs):
+            output_file.write(json.dumps(session_result, ensure_ascii=False) + "\n")
+            output_file.flush()
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
 
 
 if __name__ == "__main__":
 
-    task = input("Что делаем?\n>>> ")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", help="JSONL file with tasks to run as concurrent sessions")
+    parser.add_argument("--output", help="JSONL file for session results, stdout by default")
+    parser.add_argument("--sessions-dir", default="./agent_sessions",
+                        help="Session working directories and checkpoints, sessions found here are resumed")
+    parser.add_argument("--resume", metavar="SESSION_ID", help="Continue a checkpointed session")
+    parser.add_argument("--max-sessions", type=int, default=4)
+    parser.add_argument("--max-llm-calls", type=int, default=8)
+    parser.add_argument("--telemetry", default=os.getenv("TELEMETRY_JSONL"), help="JSONL file for telemetry spans")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this port")
+    parser.add_argument("--cassette", default=os.getenv("LLM_CASSETTE"), help="Record/replay LLM calls to this file")
+    parser.add_argument("--cassette-mode", choices=["record", "replay", "auto"],
+                        default=os.getenv("LLM_CASSETTE_MODE", "replay"))
+    parser.add_argument("--profile-imports", action="store_true", help="Report the start-up import times and exit")
+    args = parser.parse_args()
+
+    if args.profile_imports:
+        from import_profile import print_import_profile
+        print_import_profile(__file__)
+        sys.exit(0)
+
+    telemetry = Telemetry(jsonl_path=args.telemetry)
+    if args.metrics_port is not None:
+        telemetry.serve_prometheus(args.metrics_port)
 
     LLM_CONFIG = {
         "base_url": os.getenv("PROXY_BASE_URL"),
@@ -501,12 +711,45 @@ if __name__ == "__main__":
         api_key=LLM_CONFIG["api_key"],
     )
 
-    planner = Planner(llm_client)
-    planned_task, _ = planner.plan(task)
+    if args.cassette:
+        # The cassette pulls in httpx and openai, so it is imported only when used
+        from llm_cassette import Cassette, attach_cassette
+        attach_cassette(llm_client, Cassette(args.cassette, mode=args.cassette_mode))
+
+    if args.tasks:
+        asyncio.run(
+            run_sessions_to_jsonl(
+                llm_client,
+                tasks_file_path=args.tasks,
+                output_file_path=args.output,
+                sessions_directory=args.sessions_dir,
+                max_concurrent_sessions=args.max_sessions,
+                max_concurrent_llm_calls=args.max_llm_calls,
+                telemetry=telemetry,
+            )
+        )
+        print(json.dumps(telemetry.summary(), ensure_ascii=False), file=sys.stderr)
+        sys.exit(0)
+
+    checkpoint_directory = os.path.join(args.sessions_dir, "checkpoints")
+
+    if args.resume:
+        session_result = resume(llm_client, args.resume, telemetry=telemetry, checkpoint_directory=checkpoint_directory)
+    else:
+        task = input("Что делаем?\n>>> ")
+
+        checkpoint = SessionCheckpoint(datetime.now().strftime("%Y%m%d_%H%M%S"), checkpoint_directory)
+        checkpoint.start(task=task,
+                         working_directory=os.getcwd(),
+                         artifact_directory=os.path.abspath("./agent_artifacts/tool_outputs"),
+                         interactive=True)
+        print(f"Session {checkpoint.session_id}, continue it after a failure with --resume {checkpoint.session_id}")
+
+        session_result = resume(llm_client, checkpoint, telemetry=telemetry)
 
-    print(planned_task)
+    print(session_result["plan"])
 
-    coder = Coder(llm_client)
-    coder_result, _ = coder.code(user_task=task, plan=planned_task)
+    print(session_result["result"])
 
-    print(coder_result)
+    print(session_result["prompt_cache"])
+    print(telemetry.summary())
@@ -0,0 +1,87 @@
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+# platform.architecture() and platform.processor() run `file` and `uname -p` subprocesses, so the platform info
+# is computed once per machine and interpreter and read from this file afterwards
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "agent-framework", "system_context.json")
+
+_platform_info: dict | None = None
+
+
+def _platform_fingerprint() -> list[str]:
+    # os.uname() and sys attributes are cheap, any change of them invalidates the cached platform info
+    uname = platform.uname()
+    return [uname.system, uname.node, uname.release, uname.version, uname.machine, sys.version, sys.executable]
+
+
+def get_platform_info(cache_path: str | None = None) -> dict:
+    """Platform info of the machine, cached in memory and on disk."""
+    global _platform_info
+    if _platform_info is not None:
+        return _platform_info
+
+    cache_path = cache_path or os.getenv("SYSTEM_CONTEXT_CACHE") or DEFAULT_CACHE_PATH
+    fingerprint = _platform_fingerprint()
+    try:
+        with open(cache_path, "r", encoding="utf-8") as file:
+            cached = json.load(file)
+        if cached.get("fingerprint") == fingerprint:
+            _platform_info = cached["platform_info"]
+            return _platform_info
+    except (OSError, ValueError, KeyError):
+        pass
+
+    _platform_info = {
+        "system": platform.system(),
+        "release": platform.release(),
+        "version": platform.version(),
+        "architecture": platform.architecture()[0],
+        "processor": platform.processor(),
+        "machine": platform.machine(),
+        "python_version": platform.python_version()
+    }
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump({"fingerprint": fingerprint, "platform_info": _platform_info}, file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # A read-only home only costs the subprocesses on the next start
+        pass
+    return _platform_info
+
+
+def get_environment_info() -> dict:
+    return {
+        "current_directory": os.getcwd(),
+        "username": os.getenv('USERNAME') or os.getenv('USER'),
+        "home_directory": os.path.expanduser('~'),
+        "temp_directory": os.getenv('TEMP') or os.getenv('TMP')
+    }
+
+
+def get_time_info(current_time: datetime | None = None) -> dict:
+    current_time = current_time or datetime.now()
+    return {
+        "current_datetime": current_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "current_date": current_time.strftime("%Y-%m-%d"),
+        "current_time": current_time.strftime("%H:%M:%S"),
+        "timezone": str(current_time.astimezone().tzinfo),
+        "weekday": current_time.strftime("%A"),
+        "is_weekend": current_time.weekday() >= 5
+    }
+
+
+def get_system_context() -> dict:
+    """Platform, environment and time info. Only the platform info is cached, the rest is read on every call."""
+    current_time = datetime.now()
+    return {
+        "platform_info": get_platform_info(),
+        "environment_info": get_environment_info(),
+        "time_info": get_time_info(current_time),
+        "timestamp": current_time.isoformat()
+    }
@@ -0,0 +1,201 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+from pydantic import BaseModel
+
+
+def read_usage(usage) -> tuple[int, int, int]:
+    """Return (input, output, cached input) tokens of a Responses API or Chat Completions API usage object."""
+    if usage is None:
+        return 0, 0, 0
+
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is not None:
+        output_tokens = getattr(usage, "output_tokens", 0)
+        details = getattr(usage, "input_tokens_details", None)
+    else:
+        input_tokens = getattr(usage, "prompt_tokens", 0)
+        output_tokens = getattr(usage, "completion_tokens", 0)
+        details = getattr(usage, "prompt_tokens_details", None)
+
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    return input_tokens or 0, output_tokens or 0, cached_tokens
+
+
+class Span(BaseModel):
+    run_id: str
+    stage: str
+    kind: str
+    name: str | None = None
+    step: int | None = None
+    started_at: float = 0.0
+    latency_seconds: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    retries: int = 0
+    # False when the call ended before the API reported its usage, e.g. a stream closed early
+    usage_known: bool = True
+    outcome: str = "ok"
+    error: str | None = None
+
+    def record_usage(self, usage) -> None:
+        self.input_tokens, self.output_tokens, self.cached_tokens = read_usage(usage)
+
+
+class Telemetry:
+    """
+    Records a span for every LLM call and tool execution of a run.
+    Spans are appended to a JSONL file as they finish, exposed as Prometheus text and summarized per stage and kind.
+    """
+
+    def __init__(self, jsonl_path: str | None = None, run_id: str | None = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._spans: list[Span] = []
+        self._active_spans = threading.local()
+        self._http_server: ThreadingHTTPServer | None = None
+
+    @contextmanager
+    def span(self, stage: str, kind: str = "llm", name: str | None = None, step: int | None = None) -> Iterator[Span]:
+        span = Span(run_id=self.run_id, stage=stage, kind=kind, name=name, step=step, started_at=time.time())
+        previous_span = getattr(self._active_spans, "span", None)
+        self._active_spans.span = span
+        started_at = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.latency_seconds = time.perf_counter() - started_at
+            self._active_spans.span = previous_span
+            self._finish(span)
+
+    def on_http_request(self, request) -> None:
+        """
+        httpx request hook counting retries of the OpenAI SDK for the active span.
+        Install it as `event_hooks={"request": [telemetry.on_http_request]}` of the client's `http_client`.
+        """
+        span = getattr(self._active_spans, "span", None)
+        if span is not None:
+            span.retries = max(span.retries, int(request.headers.get("x-stainless-retry-count", "0")))
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self, top: int = 5) -> dict:
+        """
+        Totals per stage and span kind with the slowest and the most expensive stages and calls of the run.
+        Stages are keyed "stage/kind", so e.g. the LLM calls and the tool executions of the coder stay apart.
+        Token totals leave out the `usage_unknown` calls of a stage, so its cost is a lower bound then.
+        """
+        stages: dict[str, dict] = {}
+        for span in self.spans():
+            stage = stages.setdefault(
+                f"{span.stage}/{span.kind}",
+                {"stage": span.stage, "kind": span.kind, "calls": 0, "errors": 0, "latency_seconds": 0.0,
+                 "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "retries": 0, "usage_unknown": 0},
+            )
+            stage["calls"] += 1
+            # A stream closed at the closing fence got everything it needed
+            stage["errors"] += span.outcome not in ("ok", "cancelled_at_fence")
+            stage["usage_unknown"] += not span.usage_known
+            stage["latency_seconds"] += span.latency_seconds
+            stage["input_tokens"] += span.input_tokens
+            stage["output_tokens"] += span.output_tokens
+            stage["cached_tokens"] += span.cached_tokens
+            stage["retries"] += span.retries
+
+        spans = self.spans()
+        return {
+            "run_id": self.run_id,
+            "stages": stages,
+            "slowest_stages": sorted(stages, key=lambda name: stages[name]["latency_seconds"], reverse=True)[:top],
+            "most_expensive_stages": sorted(
+                stages, key=lambda name: stages[name]["input_tokens"] + stages[name]["output_tokens"], reverse=True
+            )[:top],
+            "slowest_calls": [
+                span.model_dump(include={"stage", "kind", "name", "step", "latency_seconds"})
+                for span in sorted(spans, key=lambda span: span.latency_seconds, reverse=True)[:top]
+            ],
+        }
+
+    def prometheus_text(self) -> str:
+        """Render aggregated spans in the Prometheus text exposition format."""
+        metrics: dict[tuple[str, str], float] = {}
+        for span in self.spans():
+            labels = f'stage="{span.stage}",kind="{span.kind}",outcome="{span.outcome}"'
+            for metric, value in (
+                ("agent_calls_total", 1),
+                ("agent_latency_seconds_sum", span.latency_seconds),
+                ("agent_input_tokens_total", span.input_tokens),
+                ("agent_output_tokens_total", span.output_tokens),
+                ("agent_cached_tokens_total", span.cached_tokens),
+                ("agent_retries_total", span.retries),
+                ("agent_usage_unknown_total", not span.usage_known),
+            ):
+                metrics[(metric, labels)] = metrics.get((metric, labels), 0) + value
+
+        lines = []
+        for metric in sorted({metric for metric, _ in metrics}):
+            lines.append(f"# TYPE {metric} counter")
+            for (name, labels), value in sorted(metrics.items()):
+                if name == metric:
+                    lines.append(f"{metric}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int = 9464, host: str = "127.0.0.1") -> None:
+        """Serve `prometheus_text()` on http://host:port/metrics from a background thread."""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._http_server.serve_forever, name="telemetry-metrics", daemon=True).start()
+
+    def close(self) -> None:
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server = None
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            if self.jsonl_path is not None:
+                with open(self.jsonl_path, "a", encoding="utf-8") as file:
+                    file.write(span.model_dump_json() + "\n")
+
+
+@contextmanager
+def maybe_span(telemetry: Telemetry | None,
+               stage: str,
+               kind: str = "llm",
+               name: str | None = None,
+               step: int | None = None) -> Iterator[Span]:
+    """Span of the telemetry, or a detached span that is not recorded when telemetry is disabled."""
+    if telemetry is None:
+        yield Span(run_id="", stage=stage, kind=kind, name=name, step=step)
+        return
+    with telemetry.span(stage, kind=kind, name=name, step=step) as span:
+        yield span
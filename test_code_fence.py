@@ -0,0 +1,60 @@
+import pytest
+
+from code_fence import CodeFenceExtractor, extract_code
+
+RESPONSE = "Here is the tool:\n```python\nprint('a')\n\nprint('b')\n```\nIt prints two lines."
+CODE = "print('a')\n\nprint('b')\n"
+
+
+def feed_chunks(text: str, chunk_size: int) -> tuple[CodeFenceExtractor, int | None]:
+    """Feed the text in chunks, return the extractor and the index of the chunk that closed the block."""
+    extractor = CodeFenceExtractor()
+    for index, start in enumerate(range(0, len(text), chunk_size)):
+        if extractor.feed(text[start:start + chunk_size]):
+            return extractor, index
+    return extractor, None
+
+
+def test_extract_code_from_complete_response():
+    assert extract_code(RESPONSE) == CODE
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16])
+def test_fences_split_across_chunks(chunk_size):
+    extractor, closed_at = feed_chunks(RESPONSE, chunk_size)
+
+    assert closed_at is not None
+    assert extractor.finish() == CODE
+    # The block closes at the chunk completing the closing fence, before the trailing prose
+    closing_fence_end = RESPONSE.index("\n```\n") + len("\n```")
+    assert closed_at == (closing_fence_end - 1) // chunk_size
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1000])
+def test_skips_non_python_block_before_code(chunk_size):
+    text = "Input example:\n```json\n{\"value\": 1}\n```\nCode:\n```python\nx = 1\n```\n"
+
+    extractor, closed_at = feed_chunks(text, chunk_size)
+
+    assert closed_at is not None
+    assert extractor.finish() == "x = 1\n"
+
+
+def test_block_without_language_is_accepted():
+    assert extract_code("```\nx = 1\n```") == "x = 1\n"
+
+
+def test_py_language_tag():
+    assert extract_code("```py\nx = 1\n```") == "x = 1\n"
+
+
+def test_fallbacks_when_stream_ends_early():
+    assert extract_code("```python\nx = 1\ny = 2") == "x = 1\ny = 2"
+    assert extract_code("  x = 1\n") == "x = 1\n"
+
+
+def test_feed_after_close_is_ignored():
+    extractor = CodeFenceExtractor()
+    assert extractor.feed("```python\nx = 1\n```")
+    assert extractor.feed("\n```python\ny = 2\n```")
+    assert extractor.code == "x = 1\n"
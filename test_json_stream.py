@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from json_stream import JsonArrayItemExtractor
+
+PLAN = {
+    "name": "Agent",
+    "description": "Says \"hi\", then \\ escapes }] and {[ inside strings",
+    "tools": [
+        {"name": "first", "parameters": [{"name": "a", "description": "quote \" and bracket ]"}]},
+        {"name": "second", "parameters": []},
+    ],
+    "steps": [{"name": "not a tool"}],
+}
+
+
+def extract_in_chunks(text: str, chunk_size: int) -> list[tuple[int, dict]]:
+    """Feed the text in chunks, return every item with the index of the chunk that completed it."""
+    extractor = JsonArrayItemExtractor("tools")
+    return [
+        (index, item)
+        for index, start in enumerate(range(0, len(text), chunk_size))
+        for item in extractor.feed(text[start:start + chunk_size])
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100000])
+def test_items_split_across_chunks(chunk_size):
+    text = json.dumps(PLAN)
+
+    items = extract_in_chunks(text, chunk_size)
+
+    assert [item for _, item in items] == PLAN["tools"]
+
+
+def test_item_is_returned_as_soon_as_it_is_closed():
+    text = json.dumps(PLAN)
+    first_item_end = text.index('{"name": "second"')
+
+    items = extract_in_chunks(text, 1)
+
+    assert items[0][0] < first_item_end
+
+
+def test_escaped_quotes_inside_strings():
+    text = json.dumps({"tools": [{"name": "a\\\"}b", "description": "\"]}"}]})
+
+    assert [item for _, item in extract_in_chunks(text, 1)] == [{"name": "a\\\"}b", "description": "\"]}"}]
+
+
+def test_arrays_after_the_tools_array_are_ignored():
+    text = json.dumps({"tools": [{"name": "a"}], "other": [{"name": "b"}], "tools_extra": [{"name": "c"}]})
+
+    assert [item for _, item in extract_in_chunks(text, 3)] == [{"name": "a"}]
+
+
+def test_tools_key_in_a_nested_object_is_ignored():
+    text = json.dumps({"meta": {"tools": [{"name": "nested"}]}, "tools": [{"name": "a"}]})
+
+    assert [item for _, item in extract_in_chunks(text, 5)] == [{"name": "a"}]
+
+
+def test_string_value_equal_to_the_key_is_not_a_key():
+    text = json.dumps({"kind": "tools", "other": [{"name": "b"}]})
+
+    assert extract_in_chunks(text, 1) == []
@@ -0,0 +1,217 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+
+from pydantic import BaseModel
+
+from models import ToolSchema, BaseTool, ToolManifest
+from tool_creator import ToolCreator
+from tool_file_utils import format_generated_tool_filename, create_generated_tools_directory
+from tool_registry import ToolRegistry
+from tool_manifest import read_tool_manifest, compute_content_hash, write_tool_manifest
+from tool_sandbox import ToolSandbox, ToolSandboxResult
+from tool_worker_pool import ToolWorkerPool
+
+
+class ToolBuildResult(BaseModel):
+    tool_schema: ToolSchema
+    tool_filepath: str
+    tool: BaseTool | None = None
+    manifest: ToolManifest | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ToolBuilder:
+    """
+    Builds tools from planned schemas and registers them.
+    Code generation and refinement run concurrently, at most `max_concurrency` tools at once.
+    Loading and registration run afterwards in the plan order, so the registry content does not
+    depend on which tool finished first. In lazy mode tools are registered by their manifests and
+    imported only when requested from the registry. With a worker pool, tools are never imported in
+    this process: the registry hands out proxies that run calls in warm workers.
+    Tools can be generated speculatively while the plan is still streamed, `build` then reuses them.
+    """
+
+    def __init__(self,
+                 tool_creator: ToolCreator,
+                 tool_registry: ToolRegistry,
+                 max_concurrency: int = 4,
+                 generated_tool_dir: str = "./generated_tools",
+                 bypass_cache: bool = False,
+                 sandbox: ToolSandbox | None = None,
+                 lazy: bool = False,
+                 worker_pool: ToolWorkerPool | None = None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be greater than 0")
+        self.tool_creator = tool_creator
+        self.tool_registry = tool_registry
+        self.max_concurrency = max_concurrency
+        self.generated_tool_dir = generated_tool_dir
+        self.bypass_cache = bypass_cache
+        self.sandbox = sandbox
+        self.lazy = lazy
+        self.worker_pool = worker_pool
+        self._executor: ThreadPoolExecutor | None = None
+        self._speculations: dict[str, tuple[str, ToolBuildResult, Future]] = {}
+        self._speculation_lock = threading.Lock()
+
+    def speculate(self, tool_schema: ToolSchema, task: str) -> None:
+        """
+        Start generating a tool before the plan is complete, e.g. from a streaming planner.
+        `build` reuses the generation when its plan has the same schema for the same task and discards it otherwise.
+        """
+        tools_directory = create_generated_tools_directory(self.generated_tool_dir)
+        result = ToolBuildResult(
+            tool_schema=tool_schema,
+            tool_filepath=f"{tools_directory}/{format_generated_tool_filename(tool_schema.name)}",
+        )
+        with self._speculation_lock:
+            previous_speculation = self._speculations.pop(tool_schema.name, None)
+        if previous_speculation is not None and not previous_speculation[2].cancel():
+            # Both generations write the same file, so the earlier one has to finish first
+            wait([previous_speculation[2]])
+
+        with self._speculation_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            self._speculations[tool_schema.name] = (task, result, self._executor.submit(self._generate, result, task))
+
+    def cancel_speculations(self) -> None:
+        """
+        Drop speculative generations that no `build` will collect, e.g. after planning failed.
+        Queued generations are cancelled and running ones are waited for, so no tool file is written afterwards.
+        """
+        with self._speculation_lock:
+            self._speculations = {}
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def build(self,
+              tool_schemas: list[ToolSchema],
+              task: str,
+              regenerate: set[str] | None = None) -> list[ToolBuildResult]:
+        """
+        Generate, save, load and register a tool for every schema.
+        A failing tool is reported in its result and doesn't abort the others.
+        With `regenerate` set, only tools with these names are generated; the others are loaded from
+        their existing files when present. Tools already generated by `speculate` are not generated again.
+        Tools already in the registry, e.g. restored from its store, are replaced by the built ones.
+        """
+        tools_directory = create_generated_tools_directory(self.generated_tool_dir)
+
+        with self._speculation_lock:
+            speculations, self._speculations = self._speculations, {}
+            executor, self._executor = self._executor, None
+
+        results = []
+        speculative_results = set()
+        speculative_generations = []
+        for tool_schema in tool_schemas:
+            speculation = speculations.pop(tool_schema.name, None)
+            if speculation is not None and speculation[0] == task and speculation[1].tool_schema == tool_schema:
+                _, result, future = speculation
+                speculative_results.add(id(result))
+                speculative_generations.append(future)
+            else:
+                if speculation is not None:
+                    speculations[tool_schema.name] = speculation
+                result = ToolBuildResult(
+                    tool_schema=tool_schema,
+                    tool_filepath=f"{tools_directory}/{format_generated_tool_filename(tool_schema.name)}",
+                )
+            results.append(result)
+
+        # A discarded generation writes the file of its tool name, so that tool can't be loaded from its file
+        wait([future for _, _, future in speculations.values()])
+
+        results_to_generate = [
+            result for result in results
+            if id(result) not in speculative_results
+            and (regenerate is None
+                 or result.tool_schema.name in regenerate
+                 or result.tool_schema.name in speculations
+                 or not os.path.exists(result.tool_filepath))
+        ]
+
+        with executor or ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            list(executor.map(lambda result: self._generate(result, task), results_to_generate))
+            wait(speculative_generations)
+
+        if self.sandbox is not None:
+            self._check_in_sandbox([result for result in results if result.ok])
+
+        for result in results:
+            if result.ok:
+                self._load_and_register(result)
+
+        if self.worker_pool is not None:
+            self._warm_workers([result for result in results if result.ok])
+
+        return results
+
+    def _generate(self, result: ToolBuildResult, task: str) -> None:
+        try:
+            tool_code: str = self.tool_creator.generate_tool_code(tool_schema=result.tool_schema,
+                                                                    task=task,
+                                                                    bypass_cache=self.bypass_cache)
+            self.tool_creator.save_code_to_file(tool_code, python_tool_file_path=result.tool_filepath)
+        except Exception as e:
+            result.error = f"Tool generation failed: {e}"
+
+    def _check_in_sandbox(self, results: list[ToolBuildResult]) -> None:
+        sandbox_results = self.sandbox.check_many([result.tool_filepath for result in results])
+        for result, sandbox_result in zip(results, sandbox_results):
+            if not sandbox_result.ok:
+                result.error = f"Tool sandbox check failed at stage '{sandbox_result.stage}': {sandbox_result.error}"
+            elif self.lazy or self.worker_pool is not None:
+                self._write_manifest_from_sandbox(sandbox_result)
+
+    @staticmethod
+    def _write_manifest_from_sandbox(sandbox_result: ToolSandboxResult) -> None:
+        # The sandbox has imported the tool anyway, so its metadata covers tools without static metadata
+        if read_tool_manifest(sandbox_result.tool_filepath) is not None:
+            return
+        with open(sandbox_result.tool_filepath, "r", encoding="utf-8") as file:
+            content_hash = compute_content_hash(file.read())
+        write_tool_manifest(
+            ToolManifest(
+                tool_filepath=sandbox_result.tool_filepath,
+                content_hash=content_hash,
+                **sandbox_result.tool_info,
+            )
+        )
+
+    def _load_and_register(self, result: ToolBuildResult) -> None:
+        try:
+            if self.worker_pool is not None:
+                manifest = read_tool_manifest(result.tool_filepath)
+                if manifest is None:
+                    raise ValueError("Tool metadata can't be read without importing it")
+                result.manifest = self.tool_registry.register_lazy(
+                    result.tool_filepath, manifest, loader=partial(self.worker_pool.remote_tool, manifest), replace=True
+                )
+                return
+            if self.lazy:
+                result.manifest = self.tool_registry.register_lazy(result.tool_filepath, replace=True)
+                return
+            tool_instance: BaseTool = self.tool_creator.get_tool_instance(python_tool_file_path=result.tool_filepath)
+            self.tool_registry.register(tool=tool_instance, python_tool_file_path=result.tool_filepath, replace=True)
+            result.tool = tool_instance
+        except Exception as e:
+            result.error = f"Tool loading failed: {e}"
+
+    def _warm_workers(self, results: list[ToolBuildResult]) -> None:
+        errors = self.worker_pool.warm([result.tool_filepath for result in results])
+        for result in results:
+            if result.tool_filepath in errors:
+                result.error = f"Tool import in worker failed: {errors[result.tool_filepath]}"
+                # The proxy would fail on every call, so the agent must not be handed the tool
+                if result.manifest is not None and self.tool_registry.has_tool(result.manifest.identifier):
+                    self.tool_registry.unregister(result.manifest.identifier)
+                result.manifest = None
@@ -0,0 +1,159 @@
+import glob
+import importlib.util
+import marshal
+import os
+import sys
+import zipfile
+
+from pydantic import BaseModel
+
+from models import ToolManifest
+from tool_loader import get_tool_module_name, invalidate_bundle, load_bundled_tool_instance
+from tool_manifest import compute_content_hash, read_tool_manifest
+from tool_registry import ToolRegistry
+
+BUNDLE_MANIFEST_NAME = "bundle_manifest.json"
+
+
+class BundledTool(BaseModel):
+    module_name: str
+    tool_filepath: str
+    content_hash: str
+    manifest: ToolManifest | None = None
+
+
+class ToolBundleManifest(BaseModel):
+    python_version: str
+    tools: list[BundledTool]
+    skipped: dict[str, str] = {}
+
+
+def build_tool_bundle(tools_directory: str = "./generated_tools",
+                      bundle_path: str = "./generated_tools/tools_bundle.zip") -> ToolBundleManifest:
+    """
+    Compile all generated tools in the directory to bytecode and pack them into one zipimport-able archive.
+    Every tool gets its own stable module name; files that don't compile are listed in `skipped`.
+    Tools unchanged since the existing bundle reuse its bytecode, and an up-to-date bundle is not rewritten.
+    """
+    previous_manifest, previous_modules = _read_previous_bundle(bundle_path)
+    previous_hashes = {bundled_tool.module_name: bundled_tool.content_hash
+                       for bundled_tool in (previous_manifest.tools if previous_manifest is not None else [])}
+    bundled_tools = []
+    skipped = {}
+    compiled_modules = {}
+
+    for tool_filepath in sorted(glob.glob(os.path.join(tools_directory, "*.py"))):
+        with open(tool_filepath, "r", encoding="utf-8") as file:
+            code = file.read()
+        module_name = get_tool_module_name(tool_filepath)
+        content_hash = compute_content_hash(code)
+
+        if previous_hashes.get(module_name) == content_hash:
+            compiled_modules[module_name] = previous_modules[module_name]
+        else:
+            try:
+                code_object = compile(code, tool_filepath, "exec", dont_inherit=True)
+            except SyntaxError as e:
+                skipped[tool_filepath] = f"{e.msg} at line {e.lineno}"
+                continue
+            compiled_modules[module_name] = _to_pyc(code, code_object)
+
+        bundled_tools.append(
+            BundledTool(
+                module_name=module_name,
+                tool_filepath=tool_filepath,
+                content_hash=content_hash,
+                manifest=read_tool_manifest(tool_filepath),
+            )
+        )
+
+    bundle_manifest = ToolBundleManifest(
+        python_version=importlib.util.MAGIC_NUMBER.hex(),
+        tools=bundled_tools,
+        skipped=skipped,
+    )
+    if bundle_manifest == previous_manifest:
+        return bundle_manifest
+
+    tmp_bundle_path = f"{bundle_path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_bundle_path, "w", compression=zipfile.ZIP_STORED) as bundle:
+        for module_name, pyc in compiled_modules.items():
+            bundle.writestr(f"{module_name}.pyc", pyc)
+        bundle.writestr(BUNDLE_MANIFEST_NAME, bundle_manifest.model_dump_json())
+    os.replace(tmp_bundle_path, bundle_path)
+    invalidate_bundle(bundle_path)
+
+    return bundle_manifest
+
+
+def read_tool_bundle_manifest(bundle_path: str) -> ToolBundleManifest:
+    """Read the bundle manifest. Raises ValueError if the bundle was built by another Python version."""
+    with zipfile.ZipFile(bundle_path) as bundle:
+        bundle_manifest = ToolBundleManifest.model_validate_json(bundle.read(BUNDLE_MANIFEST_NAME))
+
+    if bundle_manifest.python_version != importlib.util.MAGIC_NUMBER.hex():
+        raise ValueError(f"Tool bundle '{bundle_path}' was built for another Python version.")
+
+    return bundle_manifest
+
+
+def register_tool_bundle(tool_registry: ToolRegistry,
+                         bundle_path: str = "./generated_tools/tools_bundle.zip",
+                         tool_filepaths: list[str] | None = None) -> dict[str, str]:
+    """
+    Register all tools of a bundle, or only the ones built from `tool_filepaths`.
+    Tools with static metadata are registered lazily and imported from the bundle on first use,
+    the others are imported from the bundle right away.
+    Tools already in the registry, e.g. restored from its store, are replaced by the bundled ones.
+    Returns errors of tools that couldn't be registered by module name.
+    """
+    bundle_manifest = read_tool_bundle_manifest(bundle_path)
+    errors = {}
+    selected_filepaths = None
+    if tool_filepaths is not None:
+        selected_filepaths = {os.path.abspath(tool_filepath) for tool_filepath in tool_filepaths}
+
+    for bundled_tool in bundle_manifest.tools:
+        if selected_filepaths is not None and os.path.abspath(bundled_tool.tool_filepath) not in selected_filepaths:
+            continue
+        try:
+            if bundled_tool.manifest is not None:
+                tool_registry.register_lazy(
+                    bundled_tool.tool_filepath,
+                    manifest=bundled_tool.manifest,
+                    loader=lambda module_name=bundled_tool.module_name: load_bundled_tool_instance(bundle_path,
+                                                                                                   module_name),
+                    replace=True,
+                )
+            else:
+                tool_registry.register(load_bundled_tool_instance(bundle_path, bundled_tool.module_name), replace=True)
+        except Exception as e:
+            errors[bundled_tool.module_name] = f"{type(e).__name__}: {e}"
+
+    return errors
+
+
+def _read_previous_bundle(bundle_path: str) -> tuple[ToolBundleManifest | None, dict[str, bytes]]:
+    """Manifest and bytecode of an existing bundle, or (None, {}) when there's no usable one."""
+    try:
+        bundle_manifest = read_tool_bundle_manifest(bundle_path)
+        with zipfile.ZipFile(bundle_path) as bundle:
+            compiled_modules = {bundled_tool.module_name: bundle.read(f"{bundled_tool.module_name}.pyc")
+                                for bundled_tool in bundle_manifest.tools}
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None, {}
+    return bundle_manifest, compiled_modules
+
+
+def _to_pyc(code: str, code_object) -> bytes:
+    # Unchecked hash-based pyc: zipimport loads it without looking for the source
+    flags = (1).to_bytes(4, "little")
+    return importlib.util.MAGIC_NUMBER + flags + importlib.util.source_hash(code.encode("utf-8")) + marshal.dumps(code_object)
+
+
+if __name__ == "__main__":
+
+    manifest = build_tool_bundle(*sys.argv[1:3])
+    print(f"Bundled {len(manifest.tools)} tools, skipped {len(manifest.skipped)}")
+    for tool_filepath, error in manifest.skipped.items():
+        print(f"  {tool_filepath}: {error}")
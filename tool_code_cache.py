@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import time
+
+
+class ToolCodeCache:
+    """
+    Content-addressed on-disk cache for generated tool code.
+    Entries are keyed on a hash of every input that affects the generated code, so a changed
+    schema, task, model, prompt or refinement setup never hits a stale entry.
+    """
+
+    def __init__(self,
+                 cache_dir: str = "./generated_tools/.cache",
+                 max_entries: int = 512,
+                 max_size_bytes: int = 64 * 1024 * 1024,
+                 max_age_seconds: float | None = 30 * 24 * 60 * 60):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(tool_schema_json: str,
+                 task: str,
+                 model: str,
+                 prompts: list[str],
+                 refinement_count: int = 0,
+                 validated: bool = False) -> str:
+        """Build a cache key from the generation inputs."""
+        payload = json.dumps(
+            {
+                "tool_schema": tool_schema_json,
+                "task": task,
+                "model": model,
+                "prompts": [hashlib.sha256(prompt.encode("utf-8")).hexdigest() for prompt in prompts],
+                # Code refined fewer times or never validated must not be served to a stricter setup
+                "refinement_count": refinement_count,
+                "validated": validated,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Return cached code or None if the entry is missing or expired."""
+        path = self._entry_path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if self._is_expired(stat.st_mtime):
+            self._remove(path)
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                code = file.read()
+        except FileNotFoundError:
+            return None
+
+        # Touch the entry so eviction drops the least recently used code first
+        os.utime(path)
+        return code
+
+    def put(self, key: str, code: str) -> None:
+        """Store code under the key and evict old entries if the cache is over its limits."""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(code)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then the least recently used ones until size limits are met."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or not entry.name.endswith(".py"):
+                continue
+            stat = entry.stat()
+            if self._is_expired(stat.st_mtime):
+                self._remove(entry.path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+
+        while entries and (len(entries) > self.max_entries or total_size > self.max_size_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_size -= size
+
+    def clear(self) -> None:
+        """Remove all cache entries."""
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".py"):
+                self._remove(entry.path)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.py")
+
+    def _is_expired(self, mtime: float) -> bool:
+        return self.max_age_seconds is not None and time.time() - mtime > self.max_age_seconds
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,10 +1,16 @@
-import importlib.util
-import sys
-import inspect
-
-from openai import OpenAI
+from typing import TYPE_CHECKING
 
+from code_fence import CodeFenceExtractor, extract_code
 from models import ToolSchema, BaseTool
+from prompt_assembly import PromptCacheStats
+from telemetry import Telemetry, maybe_span
+from tool_code_cache import ToolCodeCache
+from tool_loader import load_tool_instance
+from tool_manifest import extract_tool_manifest, write_tool_manifest
+from tool_validator import ToolValidator, ToolValidationResult
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 TOOL_CREATOR_SYSTEM_PROMPT = """
 You are the tool creator - a module of AI agentic framework for tool creation. Here is the base class located at 
@@ -52,18 +58,19 @@ TESTING:
 
 """
 
+# The task is shared by all tools of an agent and goes before the tool schema to keep a cacheable prompt prefix
 TOOL_CREATOR_USER_PROMPT = """
 
 Generate tool using following tool schema
 
-TOOL SCHEMA:
-
-{tool_schema}
-
 INITIAL USER TASK:
 
 {task}
 
+TOOL SCHEMA:
+
+{tool_schema}
+
 """
 
 TOOL_REFINEMENT_SYSTEM_PROMPT = """
@@ -91,15 +98,73 @@ TOOL CODE:
 
 """
 
+TOOL_REFINEMENT_VALIDATION_PROMPT = """
+
+The code failed validation. Fix the reported problem.
+
+VALIDATION REPORT:
+
+{validation_report}
+
+"""
+
 class ToolCreator:
-    def __init__(self, client: OpenAI, model: str):
+    def __init__(self,
+                 client: "OpenAI",
+                 model: str,
+                 code_cache: ToolCodeCache | None = None,
+                 stream: bool = False,
+                 validator: ToolValidator | None = None,
+                 refinement_count: int = 1,
+                 cache_stats: PromptCacheStats | None = None,
+                 telemetry: Telemetry | None = None):
         self.client = client
         self.model = model
-
-    def generate_tool_code(self, tool_schema: ToolSchema, task: str) -> str:
-        response = self.client.responses.parse(
+        self.code_cache = code_cache
+        self.stream = stream
+        self.validator = validator
+        self.refinement_count = refinement_count
+        self.cache_stats = cache_stats
+        self.telemetry = telemetry
+
+    def generate_tool_code(self, tool_schema: ToolSchema, task: str, bypass_cache: bool = False) -> str:
+        """
+        Generate and refine tool code.
+        When a code cache is configured, unchanged inputs are served from it without any LLM calls.
+        `bypass_cache` forces regeneration and overwrites the cached entry.
+        """
+        if self.code_cache is None:
+            return self._generate_tool_code(tool_schema, task)
+
+        cache_key = ToolCodeCache.make_key(
+            tool_schema_json=tool_schema.model_dump_json(),
+            task=task,
             model=self.model,
-            input=[
+            prompts=[
+                TOOL_CREATOR_SYSTEM_PROMPT,
+                TOOL_CREATOR_USER_PROMPT,
+                TOOL_REFINEMENT_SYSTEM_PROMPT,
+                TOOL_REFINEMENT_USER_PROMPT,
+                TOOL_REFINEMENT_VALIDATION_PROMPT,
+            ],
+            refinement_count=self.refinement_count,
+            validated=self.validator is not None,
+        )
+
+        if not bypass_cache:
+            cached_code = self.code_cache.get(cache_key)
+            if cached_code is not None:
+                return cached_code
+
+        code = self._generate_tool_code(tool_schema, task)
+        self.code_cache.put(cache_key, code)
+        return code
+
+    def _generate_tool_code(self, tool_schema: ToolSchema, task: str) -> str:
+        code = self._request_code(
+            "tool_creator",
+            tool_schema.name,
+            [
                 {
                     "role": "system",
                     "content": TOOL_CREATOR_SYSTEM_PROMPT
@@ -111,9 +176,7 @@ class ToolCreator:
             ]
         )
 
-        code = response.output_text.split("```python")[1].split("```")[0]
-
-        refined_code = self._run_refinement_loop(tool_schema, code)
+        refined_code = self._run_refinement_loop(tool_schema, code, refinement_count=self.refinement_count)
 
         return refined_code
 
@@ -122,51 +185,116 @@ class ToolCreator:
                              tool_schema: ToolSchema,
                              code: str,
                              refinement_count: int = 1) -> str:
+        """
+        Refine the code up to `refinement_count` times.
+        With a validator configured, every round starts with validation: valid code is returned as is,
+        and the failure report is passed to the model otherwise. Code still invalid after the last round
+        raises ValueError.
+        """
 
         code_for_refinement = code
 
-        for _ in range(refinement_count):
-            response = self.client.responses.parse(
-                model=self.model,
-                input=[
+        for refinement_round in range(refinement_count):
+            refinement_prompt = TOOL_REFINEMENT_USER_PROMPT.format(tool_schema=tool_schema.model_dump_json(),
+                                                                   code=code_for_refinement)
+
+            if self.validator is not None:
+                validation_result = self._validate(tool_schema, code_for_refinement, refinement_round)
+                if validation_result.ok:
+                    return code_for_refinement
+                refinement_prompt += TOOL_REFINEMENT_VALIDATION_PROMPT.format(
+                    validation_report=validation_result.report()
+                )
+
+            code_for_refinement = self._request_code(
+                "tool_refinement",
+                tool_schema.name,
+                [
                     {
                         "role": "system",
                         "content": TOOL_REFINEMENT_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
-                        "content": TOOL_REFINEMENT_USER_PROMPT.format(tool_schema=tool_schema.model_dump_json(),
-                                                                      code=code_for_refinement),
+                        "content": refinement_prompt,
                     }
-                ]
+                ],
+                step=refinement_round
             )
 
-            code_for_refinement = response.output_text.split("```python")[1].split("```")[0]
+        if self.validator is not None:
+            # The code of the last round has not been validated yet
+            validation_result = self._validate(tool_schema, code_for_refinement, refinement_count)
+            if not validation_result.ok:
+                raise ValueError(f"Tool '{tool_schema.name}' is still invalid after {refinement_count} refinement "
+                                 f"rounds: {validation_result.report()}")
 
         return code_for_refinement
 
+    def _validate(self, tool_schema: ToolSchema, code: str, step: int) -> ToolValidationResult:
+        with maybe_span(self.telemetry, "tool_validation", kind="tool", name=tool_schema.name, step=step) as span:
+            validation_result = self.validator.validate(code)
+            if not validation_result.ok:
+                span.outcome = f"invalid_{validation_result.stage}"
+        return validation_result
+
+    def _request_code(self,
+                      stage: str,
+                      tool_name: str,
+                      input_messages: list[dict[str, str]],
+                      step: int | None = None) -> str:
+        """
+        Request code from the model and extract the fenced code block.
+        In streaming mode the response is consumed delta by delta and the stream is closed as soon as the closing
+        fence arrives, so trailing prose is never generated. The API reports usage only at the end of the response,
+        so a stream closed at the fence is counted in the cache stats as a call with unknown usage.
+        """
+        with maybe_span(self.telemetry, stage, name=tool_name, step=step) as span:
+            if not self.stream:
+                response = self.client.responses.parse(
+                    model=self.model,
+                    input=input_messages
+                )
+                span.record_usage(response.usage)
+                if self.cache_stats is not None:
+                    self.cache_stats.record(stage, response.usage)
+                return extract_code(response.output_text)
+
+            extractor = CodeFenceExtractor()
+            stream = self.client.responses.create(
+                model=self.model,
+                input=input_messages,
+                stream=True
+            )
+            try:
+                for event in stream:
+                    if event.type == "response.output_text.delta" and extractor.feed(event.delta):
+                        span.outcome = "cancelled_at_fence"
+                        span.usage_known = False
+                        if self.cache_stats is not None:
+                            self.cache_stats.record_unknown(stage)
+                        break
+                    if event.type == "response.completed":
+                        span.record_usage(event.response.usage)
+                        if self.cache_stats is not None:
+                            self.cache_stats.record(stage, event.response.usage)
+            finally:
+                stream.close()
+
+            return extractor.finish()
+
     @staticmethod
     def save_code_to_file(code: str, python_tool_file_path: str):
+        """Save tool code and, when its metadata is static, a sidecar manifest for lazy loading."""
         if not str(python_tool_file_path).endswith(".py"):
             raise ValueError("file_path must end with .py")
         with open(python_tool_file_path, "w", encoding="utf-8") as file:
             file.write(code)
 
+        manifest = extract_tool_manifest(code, python_tool_file_path)
+        if manifest is not None:
+            write_tool_manifest(manifest)
+
     @staticmethod
     def get_tool_instance(python_tool_file_path: str) -> BaseTool:
-
-        module_name = "dynamic_module"
-        spec = importlib.util.spec_from_file_location(module_name, python_tool_file_path)
-        module = importlib.util.module_from_spec(spec)
-        sys.modules[module_name] = module
-        spec.loader.exec_module(module)
-
-        classes = [
-            name for name, obj in inspect.getmembers(module, inspect.isclass)
-            if obj.__module__ == module_name
-        ]
-
-        ToolClass = getattr(module, classes[0])
-
-        return ToolClass()
-
+        return load_tool_instance(python_tool_file_path)
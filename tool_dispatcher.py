@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from telemetry import Telemetry, maybe_span
+
+
+class ToolCallResult(BaseModel):
+    tool_call_id: str
+    tool_name: str
+    result: Any = None
+
+
+class ToolDispatcher:
+    """
+    Executes tool calls of one model response.
+    Calls of tools listed in `parallel_tools` run concurrently on a thread pool; any other call is a barrier
+    that waits for the running calls and runs alone, so tools with side effects on the conversation
+    (e.g. asking the user) keep their order. Results are returned in the original call order and
+    dispatching stops after a call of a tool from `final_tools`.
+    """
+
+    def __init__(self,
+                 tools: list[Callable],
+                 parallel_tools: set[str] | None = None,
+                 timeouts: dict[str, float] | None = None,
+                 default_timeout: float | None = None,
+                 max_workers: int = 8,
+                 final_tools: set[str] | None = None,
+                 guard: Callable[[str, dict], Any] | None = None,
+                 logger: logging.Logger | None = None,
+                 telemetry: Telemetry | None = None,
+                 stage: str = "tools"):
+        self.tools = {tool.__name__: tool for tool in tools}
+        self.parallel_tools = parallel_tools or set()
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.final_tools = final_tools if final_tools is not None else {"finish_task_tool"}
+        # Called in the original order before a tool runs; a non-None value is used as the result instead
+        self.guard = guard
+        self.logger = logger or logging.getLogger(__name__)
+        self.telemetry = telemetry
+        self.stage = stage
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-dispatcher")
+
+    def dispatch(self, tool_calls, step: int | None = None) -> list[ToolCallResult]:
+        results: list[ToolCallResult] = []
+        pending: list[tuple[ToolCallResult, Future, float]] = []
+
+        for tc in tool_calls:
+            tool_name = tc.function.name
+            call_result = ToolCallResult(tool_call_id=tc.id, tool_name=tool_name)
+            results.append(call_result)
+
+            if tool_name not in self.parallel_tools and tool_name in self.tools:
+                # Barrier: finish running calls before a sequential tool starts
+                self._wait_all(pending)
+                pending = []
+
+            future = self._submit(call_result, tc.function.arguments, step)
+            if future is None:
+                continue
+            pending.append((call_result, future, time.monotonic()))
+
+            if tool_name not in self.parallel_tools:
+                self._wait_all(pending)
+                pending = []
+
+            if tool_name in self.final_tools:
+                break
+
+        self._wait_all(pending)
+        return results
+
+    def close(self) -> None:
+        # Timed out calls can't be interrupted, so don't wait for them
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "ToolDispatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _submit(self, call_result: ToolCallResult, arguments: str, step: int | None = None) -> Future | None:
+        tool = self.tools.get(call_result.tool_name)
+        if tool is None:
+            call_result.result = f"Unknown tool: {call_result.tool_name}"
+            self.logger.error("Unknown tool requested: %s", call_result.tool_name)
+            return None
+
+        try:
+            args = json.loads(arguments or "{}")
+        except json.JSONDecodeError as e:
+            call_result.result = f"Invalid tool arguments: {e}"
+            return None
+
+        if self.guard is not None:
+            guarded_result = self.guard(call_result.tool_name, args)
+            if guarded_result is not None:
+                call_result.result = guarded_result
+                return None
+
+        self.logger.info("Running tool: %s with args: %s", call_result.tool_name, args)
+        return self._executor.submit(self._run_tool, tool, args, step)
+
+    def _run_tool(self, tool: Callable, args: dict, step: int | None) -> Any:
+        # The span is measured in the worker, so it covers the real run time even after a timeout
+        with maybe_span(self.telemetry, self.stage, kind="tool", name=tool.__name__, step=step):
+            return tool(**args)
+
+    def _wait_all(self, pending: list[tuple[ToolCallResult, Future, float]]) -> None:
+        for call_result, future, submitted_at in pending:
+            self._wait(call_result, future, submitted_at)
+
+    def _wait(self, call_result: ToolCallResult, future: Future, submitted_at: float) -> None:
+        timeout = self.timeouts.get(call_result.tool_name, self.default_timeout)
+        remaining = None if timeout is None else max(0.0, submitted_at + timeout - time.monotonic())
+        try:
+            call_result.result = future.result(timeout=remaining)
+            self.logger.info("Tool %s completed. Tool result %s", call_result.tool_name, call_result.result)
+        except FutureTimeoutError:
+            call_result.result = f"Tool execution timed out after {timeout} seconds"
+            self.logger.error("Tool %s timed out", call_result.tool_name)
+        except Exception as e:
+            call_result.result = f"Tool execution failed: {e}"
+            self.logger.exception("Tool %s failed:", call_result.tool_name)
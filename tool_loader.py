@@ -0,0 +1,68 @@
+import importlib.util
+import inspect
+import os
+import sys
+import zipimport
+from types import ModuleType
+
+from models import BaseTool
+
+# One importer per bundle, so the archive directory is read only once
+_bundle_importers: dict[str, zipimport.zipimporter] = {}
+
+
+def get_tool_module_name(python_tool_file_path: str) -> str:
+    """Unique and stable module name of a generated tool file."""
+    stem = os.path.splitext(os.path.basename(python_tool_file_path))[0]
+    return f"generated_tool_{stem}"
+
+
+def load_tool_instance(python_tool_file_path: str) -> BaseTool:
+    """Import a generated tool file and instantiate its tool class."""
+
+    module_name = get_tool_module_name(python_tool_file_path)
+    spec = importlib.util.spec_from_file_location(module_name, python_tool_file_path)
+    return _instantiate_tool(_exec_module(spec))
+
+
+def load_bundled_tool_instance(bundle_path: str, module_name: str) -> BaseTool:
+    """Import a precompiled tool module from a bundle archive and instantiate its tool class."""
+
+    importer = _bundle_importers.get(bundle_path)
+    if importer is None:
+        importer = _bundle_importers[bundle_path] = zipimport.zipimporter(bundle_path)
+
+    spec = importer.find_spec(module_name)
+    if spec is None:
+        raise KeyError(f"Module '{module_name}' not found in bundle '{bundle_path}'.")
+    return _instantiate_tool(_exec_module(spec))
+
+
+def invalidate_bundle(bundle_path: str) -> None:
+    """Re-read the bundle directory after the archive was rebuilt."""
+    importer = _bundle_importers.get(bundle_path)
+    if importer is not None:
+        importer.invalidate_caches()
+
+
+def _exec_module(spec) -> ModuleType:
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[spec.name]
+        raise
+    return module
+
+
+def _instantiate_tool(module: ModuleType) -> BaseTool:
+    # Generated modules may define helper classes next to the tool, e.g. pydantic models of its results
+    tool_classes = [
+        obj for _, obj in inspect.getmembers(module, inspect.isclass)
+        if obj.__module__ == module.__name__ and issubclass(obj, BaseTool)
+    ]
+    if len(tool_classes) != 1:
+        raise ValueError(f"Expected one BaseTool subclass in '{module.__name__}', found {len(tool_classes)}")
+
+    return tool_classes[0]()
@@ -0,0 +1,125 @@
+import ast
+import hashlib
+import json
+import os
+
+from models import ToolManifest
+
+MANIFEST_SUFFIX = ".manifest.json"
+MANIFEST_FIELDS = ("identifier", "name", "description", "parameters")
+
+
+def compute_content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def get_manifest_path(python_tool_file_path: str) -> str:
+    return python_tool_file_path[:-len(".py")] + MANIFEST_SUFFIX
+
+
+def extract_tool_manifest(code: str, python_tool_file_path: str) -> ToolManifest | None:
+    """
+    Read tool metadata statically from the `super().__init__(...)` call of the BaseTool subclass.
+    Returns None when the metadata is not made of literals and can only be known by importing the module.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    for class_node in tree.body:
+        if not isinstance(class_node, ast.ClassDef) or not _is_base_tool_subclass(class_node):
+            continue
+
+        fields = {}
+        for node in class_node.body:
+            # Metadata declared as class-level field defaults
+            if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+                fields[node.target.id] = node.value
+            if isinstance(node, ast.FunctionDef) and node.name == "__init__":
+                fields.update(_collect_super_init_kwargs(node))
+
+        try:
+            return ToolManifest(
+                tool_filepath=python_tool_file_path,
+                content_hash=compute_content_hash(code),
+                **{field: _literal(fields[field]) for field in MANIFEST_FIELDS},
+            )
+        except (KeyError, ValueError):
+            return None
+
+    return None
+
+
+def write_tool_manifest(manifest: ToolManifest) -> None:
+    with open(get_manifest_path(manifest.tool_filepath), "w", encoding="utf-8") as file:
+        file.write(manifest.model_dump_json())
+
+
+def read_tool_manifest(python_tool_file_path: str) -> ToolManifest | None:
+    """
+    Return metadata of a tool file without importing it.
+    The sidecar manifest is used while its content hash matches the file, the source AST otherwise.
+    """
+    with open(python_tool_file_path, "r", encoding="utf-8") as file:
+        code = file.read()
+
+    content_hash = compute_content_hash(code)
+    manifest_path = get_manifest_path(python_tool_file_path)
+
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as file:
+                manifest = ToolManifest.model_validate(json.load(file))
+            if manifest.content_hash == content_hash:
+                return manifest.model_copy(update={"tool_filepath": python_tool_file_path})
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+    return extract_tool_manifest(code, python_tool_file_path)
+
+
+def _is_base_tool_subclass(class_node: ast.ClassDef) -> bool:
+    return any(
+        (isinstance(base, ast.Name) and base.id == "BaseTool")
+        or (isinstance(base, ast.Attribute) and base.attr == "BaseTool")
+        for base in class_node.bases
+    )
+
+
+def _collect_super_init_kwargs(init_node: ast.FunctionDef) -> dict[str, ast.expr]:
+    local_values: dict[str, ast.expr] = {}
+    kwargs: dict[str, ast.expr] = {}
+
+    for node in ast.walk(init_node):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            local_values[node.targets[0].id] = node.value
+
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "__init__"
+            and isinstance(node.func.value, ast.Call)
+            and isinstance(node.func.value.func, ast.Name)
+            and node.func.value.func.id == "super"
+        ):
+            for keyword in node.keywords:
+                if keyword.arg is not None:
+                    kwargs[keyword.arg] = keyword.value
+
+    # Resolve arguments passed via local variables, e.g. `parameters=parameters`
+    return {
+        name: local_values.get(value.id, value) if isinstance(value, ast.Name) else value
+        for name, value in kwargs.items()
+    }
+
+
+def _literal(node: ast.expr):
+    if isinstance(node, ast.Call):
+        # `ToolParameter(name=..., ...)` or `dict(...)` with literal keyword arguments
+        if node.args or any(keyword.arg is None for keyword in node.keywords):
+            raise ValueError("Only keyword arguments are supported")
+        return {keyword.arg: _literal(keyword.value) for keyword in node.keywords}
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_literal(element) for element in node.elts]
+    return ast.literal_eval(node)
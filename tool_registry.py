@@ -1,35 +1,235 @@
-from models import BaseTool
+import json
+import os
+import threading
+from itertools import islice
+from typing import Callable, Collection, Iterator
+
+from models import BaseTool, ToolManifest
+from openai_tool_schema import to_openai_function_schema
+from tool_loader import load_tool_instance
+from tool_manifest import read_tool_manifest, compute_content_hash
+from tool_registry_store import ToolRegistryStore
+from tool_search_index import ToolSearchIndex
 
 class ToolRegistry:
-    def __init__(self):
-        self._tool_dict: dict[str, BaseTool] = {}
+    def __init__(self, store: ToolRegistryStore | None = None):
+        # Lazily registered tools are kept as manifests until the first `get_tool` call
+        self._tool_dict: dict[str, BaseTool | ToolManifest] = {}
+        self._search_index = ToolSearchIndex()
+        self._tool_loaders: dict[str, Callable[[], BaseTool]] = {}
+        self.store = store
+        # Serialized schemas are cached per tool and invalidated on register/unregister
+        self._tool_info_cache: dict[str, str] = {}
+        self._function_schema_cache: dict[str, dict] = {}
+        self._export_cache: dict[str, str] = {}
+        # Guards the tools, loaders, caches and search index, the tool watcher changes them from its own thread
+        self._lock = threading.RLock()
 
-    def register(self, tool: BaseTool) -> None:
+    def register(self, tool: BaseTool, python_tool_file_path: str | None = None, replace: bool = False) -> None:
         """
         Register a tool instance.
-        Raises ValueError if a tool with the same id already exists.
+        The tool is persisted in the store when its file path is given.
+        Raises ValueError if a tool with the same id already exists, unless `replace` is set.
+        """
+        with self._lock:
+            if tool.identifier in self._tool_dict and not replace:
+                raise ValueError(f"Tool with id '{tool.identifier}' is already registered.")
+
+            self._tool_loaders.pop(tool.identifier, None)
+            self._tool_dict[tool.identifier] = tool
+            self._on_tool_added(tool)
+
+        if self.store is not None and python_tool_file_path is not None:
+            with open(python_tool_file_path, "r", encoding="utf-8") as file:
+                content_hash = compute_content_hash(file.read())
+            self.store.save(
+                ToolManifest(
+                    identifier=tool.identifier,
+                    name=tool.name,
+                    description=tool.description,
+                    parameters=tool.parameters,
+                    tool_filepath=python_tool_file_path,
+                    content_hash=content_hash,
+                )
+            )
+
+    def register_lazy(self,
+                      python_tool_file_path: str,
+                      manifest: ToolManifest | None = None,
+                      loader: Callable[[], BaseTool] | None = None,
+                      replace: bool = False) -> ToolManifest:
         """
-        if tool.identifier in self._tool_dict:
-            raise ValueError(f"Tool with id '{tool.identifier}' is already registered.")
+        Register a tool file without importing it.
+        Metadata comes from the given manifest, the sidecar manifest or the file AST.
+        The tool is imported from the file on first use, or created by `loader` if given.
+        Raises ValueError if the metadata can't be read statically or the id is already registered,
+        unless `replace` is set.
+        """
+        if manifest is None:
+            manifest = read_tool_manifest(python_tool_file_path)
+        if manifest is None:
+            raise ValueError(f"Tool metadata of '{python_tool_file_path}' can't be read without importing it.")
+
+        with self._lock:
+            if manifest.identifier in self._tool_dict and not replace:
+                raise ValueError(f"Tool with id '{manifest.identifier}' is already registered.")
+
+            self._tool_loaders.pop(manifest.identifier, None)
+            if loader is not None:
+                self._tool_loaders[manifest.identifier] = loader
+            self._tool_dict[manifest.identifier] = manifest
+            self._on_tool_added(manifest)
+
+        if self.store is not None:
+            self.store.save(manifest)
 
-        self._tool_dict[tool.identifier] = tool
+        return manifest
+
+    def restore(self, tool_names: Collection[str] | None = None) -> list[ToolManifest]:
+        """
+        Reopen tools persisted in the store without importing them.
+        With `tool_names`, only those tools are reopened and other entries are left in the store untouched.
+        Entries whose file changed are re-read from the sidecar manifest or the source AST.
+        Returns stale entries that couldn't be refreshed statically; they are dropped from the store
+        and have to be rebuilt by the caller.
+        """
+        if self.store is None:
+            raise ValueError("Registry has no store to restore from.")
+
+        stale_manifests = []
+        for manifest, file_mtime_ns, file_size in self.store.load_all():
+            if tool_names is not None and manifest.name not in tool_names:
+                continue
+            try:
+                stat = os.stat(manifest.tool_filepath)
+            except FileNotFoundError:
+                stale_manifests.append(manifest)
+                self.store.delete(manifest.identifier)
+                continue
+
+            if stat.st_mtime_ns != file_mtime_ns or stat.st_size != file_size:
+                refreshed_manifest = read_tool_manifest(manifest.tool_filepath)
+                if refreshed_manifest is None or refreshed_manifest.identifier != manifest.identifier:
+                    stale_manifests.append(manifest)
+                    self.store.delete(manifest.identifier)
+                    continue
+                if refreshed_manifest.content_hash != manifest.content_hash:
+                    manifest = refreshed_manifest
+                self.store.save(manifest)
+
+            with self._lock:
+                self._tool_dict[manifest.identifier] = manifest
+                self._on_tool_added(manifest)
+
+        return stale_manifests
 
     def unregister(self, tool_identifier: str) -> None:
         """Remove a tool from registry and index."""
-        if tool_identifier not in self._tool_dict:
-            raise KeyError(f"Tool with id '{tool_identifier}' not found.")
-        del self._tool_dict[tool_identifier]
+        with self._lock:
+            if tool_identifier not in self._tool_dict:
+                raise KeyError(f"Tool with id '{tool_identifier}' not found.")
+            del self._tool_dict[tool_identifier]
+            self._tool_loaders.pop(tool_identifier, None)
+            self._search_index.remove(tool_identifier)
+            self._tool_info_cache.pop(tool_identifier, None)
+            self._function_schema_cache.pop(tool_identifier, None)
+            self._export_cache.clear()
+
+        if self.store is not None:
+            self.store.delete(tool_identifier)
 
     def get_tool(self, tool_identifier: str) -> BaseTool:
-        """Retrieve a tool by its id."""
-        if tool_identifier not in self._tool_dict:
-            raise KeyError(f"Tool with id '{tool_identifier}' not found.")
-        return self._tool_dict[tool_identifier]
+        """
+        Retrieve a tool by its id. Lazily registered tools are imported on the first call.
+        The import runs outside the registry lock, so a slow one doesn't block other callers or the watcher.
+        """
+        with self._lock:
+            if tool_identifier not in self._tool_dict:
+                raise KeyError(f"Tool with id '{tool_identifier}' not found.")
+            tool = self._tool_dict[tool_identifier]
+            if not isinstance(tool, ToolManifest):
+                return tool
+            manifest = tool
+            loader = self._tool_loaders.get(tool_identifier)
+
+        tool = loader() if loader is not None else load_tool_instance(manifest.tool_filepath)
+        if tool.identifier != tool_identifier:
+            raise ValueError(f"Tool file declares id '{tool.identifier}' instead of '{tool_identifier}'.")
+
+        with self._lock:
+            current = self._tool_dict.get(tool_identifier)
+            if current is manifest:
+                # The loader is kept until it succeeds, so a failed load is retried the same way
+                self._tool_loaders.pop(tool_identifier, None)
+                self._tool_dict[tool_identifier] = tool
+            elif isinstance(current, BaseTool):
+                # Another caller finished loading first
+                return current
+
+        return tool
 
     def list_tools(self) -> list[str]:
         """Return metadata for all registered tools"""
-        return [tool.tool_info() for tool in self._tool_dict.values()]
+        with self._lock:
+            return list(self._tool_info_cache.values())
+
+    def list_tools_page(self, offset: int = 0, limit: int = 100) -> list[str]:
+        """Return metadata for a page of registered tools"""
+        with self._lock:
+            return list(islice(self._tool_info_cache.values(), offset, offset + limit))
+
+    def iter_tools(self) -> Iterator[str]:
+        """Yield metadata of the tools registered when the iteration started"""
+        with self._lock:
+            tool_infos = list(self._tool_info_cache.values())
+        yield from tool_infos
+
+    def list_function_schemas(self) -> list[dict]:
+        """Return OpenAI function-calling schemas of all registered tools"""
+        with self._lock:
+            return list(self._function_schema_cache.values())
+
+    def iter_function_schemas(self) -> Iterator[dict]:
+        """Yield OpenAI function-calling schemas of the tools registered when the iteration started"""
+        with self._lock:
+            function_schemas = list(self._function_schema_cache.values())
+        yield from function_schemas
+
+    def export_tools_json(self, openai_format: bool = False) -> str:
+        """
+        Return all registered tools as one JSON array.
+        The payload is built once and reused until the next register/unregister.
+        """
+        export_key = "openai" if openai_format else "tool_info"
+        with self._lock:
+            if export_key not in self._export_cache:
+                if openai_format:
+                    items = (json.dumps(schema) for schema in self._function_schema_cache.values())
+                else:
+                    items = self._tool_info_cache.values()
+                self._export_cache[export_key] = "[" + ",".join(items) + "]"
+            return self._export_cache[export_key]
+
+    def search(self, query: str, k: int = 5) -> list[str]:
+        """Return metadata of the k tools most relevant to the query"""
+        with self._lock:
+            return [self._tool_info_cache[tool_identifier]
+                    for tool_identifier, _ in self._search_index.search(query, k)]
 
     def has_tool(self, tool_id: str) -> bool:
         """Check if a tool is registered."""
-        return tool_id in self._tool_dict
\ No newline at end of file
+        with self._lock:
+            return tool_id in self._tool_dict
+
+    def is_loaded(self, tool_id: str) -> bool:
+        """Check if a registered tool module is already imported."""
+        with self._lock:
+            return isinstance(self._tool_dict.get(tool_id), BaseTool)
+
+    def _on_tool_added(self, tool: BaseTool | ToolManifest) -> None:
+        self._tool_info_cache[tool.identifier] = tool.tool_info()
+        self._function_schema_cache[tool.identifier] = to_openai_function_schema(tool)
+        self._export_cache.clear()
+
+        parameters_text = " ".join(f"{parameter.name} {parameter.description}" for parameter in tool.parameters)
+        self._search_index.add(tool.identifier, f"{tool.name} {tool.description} {parameters_text}")
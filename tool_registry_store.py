@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+
+from models import ToolManifest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tools (
+    identifier TEXT PRIMARY KEY,
+    tool_filepath TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    file_mtime_ns INTEGER NOT NULL,
+    file_size INTEGER NOT NULL,
+    tool_info TEXT NOT NULL,
+    position INTEGER NOT NULL
+)
+"""
+
+
+class ToolRegistryStore:
+    """
+    SQLite backing store of ToolRegistry.
+    Keeps metadata, file path, content hash and the precomputed `tool_info()` JSON of every registered tool,
+    so a restarted process can reopen the registry without importing or regenerating tools.
+    """
+
+    def __init__(self, db_path: str = "./generated_tools/registry.sqlite3"):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+
+    def save(self, manifest: ToolManifest) -> None:
+        """Insert or update the tool entry."""
+        stat = os.stat(manifest.tool_filepath)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO tools (identifier, tool_filepath, content_hash, file_mtime_ns, file_size, tool_info, position)
+                VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(position), 0) + 1 FROM tools))
+                ON CONFLICT(identifier) DO UPDATE SET
+                    tool_filepath = excluded.tool_filepath,
+                    content_hash = excluded.content_hash,
+                    file_mtime_ns = excluded.file_mtime_ns,
+                    file_size = excluded.file_size,
+                    tool_info = excluded.tool_info
+                """,
+                (
+                    manifest.identifier,
+                    manifest.tool_filepath,
+                    manifest.content_hash,
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    manifest.tool_info(),
+                ),
+            )
+
+    def delete(self, tool_identifier: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM tools WHERE identifier = ?", (tool_identifier,))
+
+    def load_all(self) -> list[tuple[ToolManifest, int, int]]:
+        """Return stored manifests with the file mtime and size they were saved with, in registration order."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT tool_filepath, content_hash, file_mtime_ns, file_size, tool_info FROM tools ORDER BY position"
+            ).fetchall()
+
+        return [
+            (
+                ToolManifest(tool_filepath=tool_filepath, content_hash=content_hash, **json.loads(tool_info)),
+                file_mtime_ns,
+                file_size,
+            )
+            for tool_filepath, content_hash, file_mtime_ns, file_size, tool_info in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,135 @@
+import importlib.util
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel
+
+try:
+    import resource
+except ImportError:
+    # Resource limits are not available on Windows, only the wall-clock timeout applies there
+    resource = None
+
+RESULT_MARKER = "__TOOL_SANDBOX_RESULT__"
+
+
+class ToolSandboxResult(BaseModel):
+    tool_filepath: str
+    ok: bool
+    stage: str
+    tool_info: dict | None = None
+    error: str | None = None
+    duration_seconds: float = 0.0
+
+
+class ToolSandbox:
+    """
+    Imports and instantiates generated tool files in isolated worker processes.
+    Every tool runs in its own process with CPU time, memory and wall-clock limits, so a slow
+    import or an infinite loop in one generated file can't stall the pipeline.
+    """
+
+    def __init__(self,
+                 max_workers: int | None = None,
+                 wall_clock_timeout: float = 60.0,
+                 cpu_time_limit: int | None = 30,
+                 memory_limit_mb: int | None = 2048):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.wall_clock_timeout = wall_clock_timeout
+        self.cpu_time_limit = cpu_time_limit
+        self.memory_limit_mb = memory_limit_mb
+
+    def check(self, tool_filepath: str) -> ToolSandboxResult:
+        """Import and instantiate a single tool file in a worker process."""
+        env = os.environ.copy()
+        env["PYTHONPATH"] = os.pathsep.join(path for path in [os.getcwd(), *sys.path] if path)
+
+        started_at = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                # The worker applies the resource limits itself, preexec_fn is not safe in a threaded parent
+                [sys.executable, os.path.abspath(__file__), tool_filepath,
+                 str(self.cpu_time_limit or ""), str(self.memory_limit_mb or "")],
+                capture_output=True,
+                text=True,
+                timeout=self.wall_clock_timeout,
+                env=env,
+            )
+        except subprocess.TimeoutExpired:
+            return ToolSandboxResult(
+                tool_filepath=tool_filepath,
+                ok=False,
+                stage="timeout",
+                error=f"Tool loading timed out after {self.wall_clock_timeout} seconds",
+                duration_seconds=time.perf_counter() - started_at,
+            )
+
+        duration_seconds = time.perf_counter() - started_at
+
+        for line in reversed(completed.stdout.splitlines()):
+            if line.startswith(RESULT_MARKER):
+                payload = json.loads(line[len(RESULT_MARKER):])
+                return ToolSandboxResult(tool_filepath=tool_filepath, duration_seconds=duration_seconds, **payload)
+
+        # The worker died before reporting, e.g. it was killed by a resource limit
+        return ToolSandboxResult(
+            tool_filepath=tool_filepath,
+            ok=False,
+            stage="crash",
+            error=f"Worker exited with code {completed.returncode}: {completed.stderr[-2000:]}",
+            duration_seconds=duration_seconds,
+        )
+
+    def check_many(self, tool_filepaths: list[str]) -> list[ToolSandboxResult]:
+        """Check tool files in parallel. Results are returned in the order of `tool_filepaths`."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.check, tool_filepaths))
+
+
+def _apply_limits(cpu_time_limit: int | None, memory_limit_mb: int | None) -> None:
+    if resource is None:
+        return
+    if cpu_time_limit is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time_limit, cpu_time_limit))
+    if memory_limit_mb is not None:
+        memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def _smoke_test(tool_filepath: str) -> dict:
+    from models import BaseTool
+
+    module_name = "sandboxed_tool_module"
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, tool_filepath)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    except BaseException as e:
+        return {"ok": False, "stage": "import", "error": f"{type(e).__name__}: {e}"}
+
+    tool_classes = [
+        obj for _, obj in inspect.getmembers(module, inspect.isclass)
+        if obj.__module__ == module_name and issubclass(obj, BaseTool)
+    ]
+    if len(tool_classes) != 1:
+        return {"ok": False, "stage": "import", "error": f"Expected one BaseTool subclass, found {len(tool_classes)}"}
+
+    try:
+        tool = tool_classes[0]()
+    except BaseException as e:
+        return {"ok": False, "stage": "instantiate", "error": f"{type(e).__name__}: {e}"}
+
+    return {"ok": True, "stage": "instantiate", "tool_info": json.loads(tool.tool_info())}
+
+
+if __name__ == "__main__":
+    # Limits are applied before the tool is imported
+    _apply_limits(int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] else None,
+                  int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else None)
+    print("\n" + RESULT_MARKER + json.dumps(_smoke_test(sys.argv[1])), flush=True)
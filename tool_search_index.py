@@ -0,0 +1,76 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+from tool_file_utils import split_upper_camel_case
+
+
+def tokenize(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", split_upper_camel_case(text).lower())
+
+
+class ToolSearchIndex:
+    """
+    Incrementally maintained BM25 index over tool texts.
+    Adding or removing a tool touches only the postings of its own terms, independent of the index size.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = {}
+        self._document_terms: dict[str, list[str]] = {}
+        self._document_lengths: dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._document_lengths)
+
+    def add(self, document_id: str, text: str) -> None:
+        """Index the document, replacing its previous version."""
+        if document_id in self._document_lengths:
+            self.remove(document_id)
+
+        term_frequencies = Counter(tokenize(text))
+        for term, frequency in term_frequencies.items():
+            self._postings.setdefault(term, {})[document_id] = frequency
+
+        self._document_terms[document_id] = list(term_frequencies)
+        document_length = sum(term_frequencies.values())
+        self._document_lengths[document_id] = document_length
+        self._total_length += document_length
+
+    def remove(self, document_id: str) -> None:
+        document_length = self._document_lengths.pop(document_id, None)
+        if document_length is None:
+            return
+        self._total_length -= document_length
+
+        for term in self._document_terms.pop(document_id):
+            postings = self._postings[term]
+            del postings[document_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: int = 5) -> list[tuple[str, float]]:
+        """Return up to k (document_id, score) pairs ordered by descending relevance."""
+        documents_count = len(self._document_lengths)
+        if documents_count == 0 or k <= 0:
+            return []
+
+        average_length = self._total_length / documents_count
+        scores: dict[str, float] = {}
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for document_id, frequency in postings.items():
+                length_norm = 1 - self.b + self.b * self._document_lengths[document_id] / average_length
+                scores[document_id] = scores.get(document_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * length_norm
+                )
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
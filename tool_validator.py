@@ -0,0 +1,130 @@
+import ast
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+
+from pydantic import BaseModel
+
+
+class ToolValidationResult(BaseModel):
+    ok: bool
+    stage: str
+    output: str = ""
+
+    def report(self) -> str:
+        return f"Stage: {self.stage}\n\n{self.output}"
+
+
+class ToolValidator:
+    """
+    Cheap checks of generated tool code, ordered from the cheapest to the most expensive:
+    syntax, import resolution, tool class structure and the `if __name__ == "__main__"` self-test
+    executed in a subprocess.
+    """
+
+    def __init__(self, self_test_timeout: float = 30.0, run_self_test: bool = True, max_output_chars: int = 4000):
+        self.self_test_timeout = self_test_timeout
+        self.run_self_test = run_self_test
+        self.max_output_chars = max_output_chars
+
+    def validate(self, code: str) -> ToolValidationResult:
+        try:
+            tree = ast.parse(code)
+            compile(tree, "<generated_tool>", "exec")
+        except SyntaxError as e:
+            return ToolValidationResult(ok=False, stage="syntax", output=f"{e.msg} at line {e.lineno}: {e.text}")
+
+        unresolved_imports = self._find_unresolved_imports(tree)
+        if unresolved_imports:
+            return ToolValidationResult(
+                ok=False,
+                stage="imports",
+                output="Modules not found: " + ", ".join(sorted(unresolved_imports)),
+            )
+
+        structure_error = self._check_tool_class(tree)
+        if structure_error:
+            return ToolValidationResult(ok=False, stage="structure", output=structure_error)
+
+        if self.run_self_test:
+            return self._run_self_test(code)
+
+        return ToolValidationResult(ok=True, stage="structure")
+
+    @staticmethod
+    def _find_unresolved_imports(tree: ast.Module) -> set[str]:
+        module_names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                module_names.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                module_names.add(node.module.split(".")[0])
+
+        return {name for name in module_names if importlib.util.find_spec(name) is None}
+
+    @staticmethod
+    def _check_tool_class(tree: ast.Module) -> str | None:
+        tool_classes = [
+            node for node in tree.body
+            if isinstance(node, ast.ClassDef) and any(
+                (isinstance(base, ast.Name) and base.id == "BaseTool")
+                or (isinstance(base, ast.Attribute) and base.attr == "BaseTool")
+                for base in node.bases
+            )
+        ]
+
+        if len(tool_classes) != 1:
+            return f"Expected exactly one BaseTool subclass, found {len(tool_classes)}"
+
+        tool_class = tool_classes[0]
+        for node in tool_class.body:
+            if isinstance(node, ast.FunctionDef) and node.name == "__init__":
+                arguments = node.args
+                required_positional = len(arguments.posonlyargs) + len(arguments.args) - len(arguments.defaults)
+                required_keyword = sum(default is None for default in arguments.kw_defaults)
+                if required_positional != 1 or required_keyword:
+                    return f"`{tool_class.name}.__init__` must not take arguments besides `self`"
+
+        return None
+
+    def _run_self_test(self, code: str) -> ToolValidationResult:
+        with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False, encoding="utf-8") as file:
+            file.write(code)
+            tool_file_path = file.name
+
+        env = os.environ.copy()
+        env["PYTHONPATH"] = os.pathsep.join(path for path in [os.getcwd(), *sys.path] if path)
+
+        try:
+            completed = subprocess.run(
+                [sys.executable, tool_file_path],
+                capture_output=True,
+                text=True,
+                timeout=self.self_test_timeout,
+                env=env,
+            )
+        except subprocess.TimeoutExpired:
+            return ToolValidationResult(
+                ok=False,
+                stage="self_test",
+                output=f"Self-test timed out after {self.self_test_timeout} seconds",
+            )
+        finally:
+            os.remove(tool_file_path)
+
+        if completed.returncode != 0:
+            return ToolValidationResult(
+                ok=False,
+                stage="self_test",
+                output=self._truncate(f"Exit code {completed.returncode}\n{completed.stderr or completed.stdout}"),
+            )
+
+        return ToolValidationResult(ok=True, stage="self_test", output=self._truncate(completed.stdout))
+
+    def _truncate(self, output: str) -> str:
+        if len(output) <= self.max_output_chars:
+            return output
+        half = self.max_output_chars // 2
+        return f"{output[:half]}\n... [truncated] ...\n{output[-half:]}"
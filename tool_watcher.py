@@ -0,0 +1,149 @@
+import glob
+import logging
+import os
+import sys
+import threading
+from typing import Callable
+
+from pydantic import BaseModel
+
+from models import BaseTool, ToolManifest
+from tool_loader import get_tool_module_name, load_tool_instance
+from tool_manifest import read_tool_manifest
+from tool_registry import ToolRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class ToolReloadEvent(BaseModel):
+    tool_filepath: str
+    action: str
+    tool_identifier: str | None = None
+    error: str | None = None
+
+
+class ToolWatcher:
+    """
+    Polls the generated tools directory and hot-reloads changed tool files into the registry.
+    Only changed files are re-imported; the new tool replaces the old one in the registry in a single swap,
+    and the old module is dropped from `sys.modules`. A file that fails to load keeps its previous tool registered.
+    """
+
+    def __init__(self,
+                 tool_registry: ToolRegistry,
+                 tools_directory: str = "./generated_tools",
+                 poll_interval: float = 1.0,
+                 lazy: bool = True):
+        self.tool_registry = tool_registry
+        self.tools_directory = tools_directory
+        self.poll_interval = poll_interval
+        self.lazy = lazy
+        self._file_states: dict[str, tuple[int, int]] = {}
+        self._file_identifiers: dict[str, str] = {}
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # Files present at start are considered already loaded
+        for tool_filepath, file_state in self._scan_files().items():
+            self._file_states[tool_filepath] = file_state
+            manifest = read_tool_manifest(tool_filepath)
+            if manifest is not None:
+                self._file_identifiers[tool_filepath] = manifest.identifier
+
+    def poll(self) -> list[ToolReloadEvent]:
+        """Apply changes made since the previous poll."""
+        events = []
+        current_states = self._scan_files()
+
+        for tool_filepath, file_state in current_states.items():
+            if self._file_states.get(tool_filepath) != file_state:
+                events.append(self._apply(self._reload, tool_filepath))
+                self._file_states[tool_filepath] = file_state
+
+        for tool_filepath in set(self._file_states) - set(current_states):
+            events.append(self._apply(self._remove, tool_filepath))
+            del self._file_states[tool_filepath]
+
+        return events
+
+    def start(self) -> None:
+        """Start polling in a background thread."""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="tool-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                for event in self.poll():
+                    if event.action == "failed":
+                        logger.warning("Tool %s failed to reload: %s", event.tool_filepath, event.error)
+            except Exception:
+                # The watcher must outlive a bad poll, the next one sees the directory as it is then
+                logger.exception("Polling %s failed", self.tools_directory)
+
+    @staticmethod
+    def _apply(change: Callable[[str], ToolReloadEvent], tool_filepath: str) -> ToolReloadEvent:
+        # A file deleted or rewritten mid-poll can fail registration after loading, e.g. on os.stat
+        try:
+            return change(tool_filepath)
+        except Exception as e:
+            return ToolReloadEvent(tool_filepath=tool_filepath, action="failed", error=f"{type(e).__name__}: {e}")
+
+    def _scan_files(self) -> dict[str, tuple[int, int]]:
+        file_states = {}
+        for tool_filepath in glob.glob(os.path.join(self.tools_directory, "*.py")):
+            try:
+                stat = os.stat(tool_filepath)
+            except FileNotFoundError:
+                continue
+            file_states[tool_filepath] = (stat.st_mtime_ns, stat.st_size)
+        return file_states
+
+    def _reload(self, tool_filepath: str) -> ToolReloadEvent:
+        module_name = get_tool_module_name(tool_filepath)
+        previous_module = sys.modules.get(module_name)
+
+        try:
+            tool: BaseTool | ToolManifest | None = read_tool_manifest(tool_filepath) if self.lazy else None
+            if tool is None:
+                tool = load_tool_instance(tool_filepath)
+        except Exception as e:
+            if previous_module is not None:
+                sys.modules[module_name] = previous_module
+            return ToolReloadEvent(tool_filepath=tool_filepath, action="failed", error=f"{type(e).__name__}: {e}")
+
+        if isinstance(tool, ToolManifest):
+            # The stale module must not be reused when the lazy tool is imported on first use
+            sys.modules.pop(module_name, None)
+
+        previous_identifier = self._file_identifiers.get(tool_filepath)
+        action = "reloaded" if self.tool_registry.has_tool(tool.identifier) else "added"
+
+        if isinstance(tool, ToolManifest):
+            self.tool_registry.register_lazy(tool_filepath, manifest=tool, replace=True)
+        else:
+            self.tool_registry.register(tool, python_tool_file_path=tool_filepath, replace=True)
+
+        if previous_identifier is not None and previous_identifier != tool.identifier \
+                and self.tool_registry.has_tool(previous_identifier):
+            self.tool_registry.unregister(previous_identifier)
+        self._file_identifiers[tool_filepath] = tool.identifier
+
+        return ToolReloadEvent(tool_filepath=tool_filepath, action=action, tool_identifier=tool.identifier)
+
+    def _remove(self, tool_filepath: str) -> ToolReloadEvent:
+        sys.modules.pop(get_tool_module_name(tool_filepath), None)
+        tool_identifier = self._file_identifiers.pop(tool_filepath, None)
+        if tool_identifier is not None and self.tool_registry.has_tool(tool_identifier):
+            self.tool_registry.unregister(tool_identifier)
+        return ToolReloadEvent(tool_filepath=tool_filepath, action="removed", tool_identifier=tool_identifier)
@@ -0,0 +1,257 @@
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import traceback
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable
+
+from pydantic import PrivateAttr
+
+from models import BaseTool, ToolManifest
+
+# Heavy dependencies of generated tools, imported by the workers before the first call if installed
+DEFAULT_PRELOAD_MODULES = ("numpy", "pandas", "matplotlib", "matplotlib.pyplot", "requests", "httpx")
+
+
+class RemoteTool(BaseTool):
+    """Tool proxy created from a manifest; calls run in a warm worker of the pool."""
+
+    _pool: "ToolWorkerPool" = PrivateAttr()
+    _tool_filepath: str = PrivateAttr()
+
+    def __call__(self, *args, **kwargs):
+        return self._pool.call(self._tool_filepath, *args, **kwargs)
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.Process, connection: Connection):
+        self.process = process
+        self.connection = connection
+
+
+class ToolWorkerPool:
+    """
+    Executes registered tools in a pool of long-lived worker processes.
+    Workers import heavy dependencies once at start and keep tool modules imported between calls, so
+    a call costs an IPC round trip instead of imports, and a crashing tool doesn't take the host down.
+    Results above `shared_memory_threshold` bytes (bytes, str, numpy arrays) are passed through shared
+    memory instead of the pipe. A worker that times out or dies is replaced.
+    """
+
+    def __init__(self,
+                 workers: int = 2,
+                 preload_modules: tuple[str, ...] = DEFAULT_PRELOAD_MODULES,
+                 shared_memory_threshold: int = 1024 * 1024,
+                 call_timeout: float | None = 300.0):
+        if workers < 1:
+            raise ValueError("workers must be greater than 0")
+        self.preload_modules = preload_modules
+        self.shared_memory_threshold = shared_memory_threshold
+        self.call_timeout = call_timeout
+        # Workers fork from a server process that has the dependencies imported, so replacements start warm
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload([module for module in preload_modules if _is_installed(module)])
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self._warm_tool_filepaths: list[str] = []
+        self._lock = threading.Lock()
+        self._idle_workers: queue.Queue[_Worker] = queue.Queue()
+        self._worker_count = workers
+        for _ in range(workers):
+            self._idle_workers.put(self._start_worker())
+
+    def warm(self, tool_filepaths: list[str]) -> dict[str, str]:
+        """Import tool modules in every worker ahead of their first call. Returns import errors by tool file."""
+        errors = {}
+        with self._lock:
+            self._warm_tool_filepaths.extend(path for path in tool_filepaths if path not in self._warm_tool_filepaths)
+            workers = [self._idle_workers.get() for _ in range(self._worker_count)]
+            try:
+                for worker in workers:
+                    worker.connection.send(("warm", tool_filepaths))
+                for worker in workers:
+                    _, worker_errors = worker.connection.recv()
+                    errors.update(worker_errors)
+            finally:
+                for worker in workers:
+                    self._idle_workers.put(worker)
+        return errors
+
+    def call(self, tool_filepath: str, *args, **kwargs) -> Any:
+        """Call the tool of a generated tool file in a worker and return its result."""
+        worker = self._idle_workers.get()
+        try:
+            if not worker.process.is_alive():
+                # An idle worker can only die from outside, e.g. the OOM killer
+                self._stop_worker(worker)
+                worker = self._start_worker()
+            worker.connection.send(("call", tool_filepath, args, kwargs))
+            if not worker.connection.poll(self.call_timeout):
+                self._stop_worker(worker)
+                worker = self._start_worker()
+                raise TimeoutError(f"Tool '{tool_filepath}' timed out after {self.call_timeout} seconds")
+            try:
+                status, *payload = worker.connection.recv()
+            except EOFError:
+                worker.process.join(1)
+                exit_code = worker.process.exitcode
+                self._stop_worker(worker)
+                worker = self._start_worker()
+                raise RuntimeError(f"Worker running tool '{tool_filepath}' died with exit code {exit_code}")
+        finally:
+            self._idle_workers.put(worker)
+
+        if status == "error":
+            raise RuntimeError(f"Tool '{tool_filepath}' failed: {payload[0]}\n{payload[1]}")
+        return _unpack_result(status, payload)
+
+    def remote_tool(self, manifest: ToolManifest) -> RemoteTool:
+        tool = RemoteTool(identifier=manifest.identifier,
+                          name=manifest.name,
+                          description=manifest.description,
+                          parameters=manifest.parameters)
+        tool._pool = self
+        tool._tool_filepath = manifest.tool_filepath
+        return tool
+
+    def close(self) -> None:
+        for _ in range(self._worker_count):
+            self._stop_worker(self._idle_workers.get())
+
+    def _start_worker(self) -> _Worker:
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_connection, self.preload_modules, self.shared_memory_threshold, list(sys.path),
+                  list(self._warm_tool_filepaths)),
+            name="tool-worker",
+            daemon=True,
+        )
+        process.start()
+        child_connection.close()
+        return _Worker(process, parent_connection)
+
+    @staticmethod
+    def _stop_worker(worker: _Worker) -> None:
+        worker.connection.close()
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+
+
+def _is_installed(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def _worker_main(connection: Connection,
+                 preload_modules: tuple[str, ...],
+                 shared_memory_threshold: int,
+                 sys_path: list[str],
+                 tool_filepaths: list[str]) -> None:
+    sys.path[:] = sys_path
+    # Workers have no display
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module_name in preload_modules:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+    from tool_loader import get_tool_module_name, load_tool_instance
+
+    tools: dict[str, tuple[int, BaseTool]] = {}
+
+    def get_tool(tool_filepath: str) -> BaseTool:
+        mtime_ns = os.stat(tool_filepath).st_mtime_ns
+        cached = tools.get(tool_filepath)
+        if cached is None or cached[0] != mtime_ns:
+            # The tool file was regenerated, so import it anew
+            sys.modules.pop(get_tool_module_name(tool_filepath), None)
+            tools[tool_filepath] = (mtime_ns, load_tool_instance(tool_filepath))
+        return tools[tool_filepath][1]
+
+    def warm(tool_filepaths: list[str]) -> dict[str, str]:
+        errors = {}
+        for tool_filepath in tool_filepaths:
+            try:
+                get_tool(tool_filepath)
+            except Exception as e:
+                errors[tool_filepath] = f"{type(e).__name__}: {e}"
+        return errors
+
+    warm(tool_filepaths)
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            if request[0] == "warm":
+                connection.send(("ok", warm(request[1])))
+            else:
+                _, tool_filepath, args, kwargs = request
+                connection.send(_pack_result(get_tool(tool_filepath)(*args, **kwargs), shared_memory_threshold))
+        except BaseException as e:
+            connection.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+
+def _pack_result(result: Any, shared_memory_threshold: int) -> tuple:
+    if isinstance(result, str) and len(result) >= shared_memory_threshold:
+        return ("shared_str", _to_shared_memory(result.encode("utf-8")))
+    if isinstance(result, (bytes, bytearray, memoryview)) and len(result) >= shared_memory_threshold:
+        return ("shared_bytes", _to_shared_memory(result))
+    # numpy arrays are detected without importing numpy in the pool module
+    if type(result).__module__ == "numpy" and hasattr(result, "__array_interface__") \
+            and result.nbytes >= shared_memory_threshold:
+        return ("shared_array", _to_shared_memory(result.tobytes()), result.dtype.str, result.shape)
+    # Fail here rather than in `send`, which would leave a half written message in the pipe
+    return ("value", pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _to_shared_memory(data) -> tuple[str, int]:
+    size = len(data) if not isinstance(data, memoryview) else data.nbytes
+    shared_memory = SharedMemory(create=True, size=max(size, 1))
+    shared_memory.buf[:size] = data
+    shared_memory.close()
+    return shared_memory.name, size
+
+
+def _from_shared_memory(name: str, size: int, convert: Callable[[memoryview], Any]) -> Any:
+    # The reader owns the segment from now on and copies it out exactly once
+    shared_memory = SharedMemory(name=name)
+    try:
+        buffer = shared_memory.buf[:size]
+        try:
+            return convert(buffer)
+        finally:
+            buffer.release()
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def _unpack_result(status: str, payload: list) -> Any:
+    if status == "value":
+        return pickle.loads(payload[0])
+    if status == "shared_str":
+        return _from_shared_memory(*payload[0], lambda buffer: str(buffer, "utf-8"))
+    if status == "shared_bytes":
+        return _from_shared_memory(*payload[0], bytes)
+    if status == "shared_array":
+        import numpy
+        (name, size), dtype, shape = payload
+        return _from_shared_memory(name, size,
+                                   lambda buffer: numpy.frombuffer(buffer, dtype=dtype).reshape(shape).copy())
+    raise ValueError(f"Unknown tool result type: {status}")